@@ -1,28 +1,45 @@
 import streamlit as st
 import time
-import pandas as pd
 from datetime import datetime, timedelta
 
+# Mede os imports de topo do app (o streamlit já vem carregado pelo `streamlit run`)
+_inicio_imports = time.perf_counter()
 from config import (
     STREAMLIT_APP_NAME, DB_TYPE, TABLE_SIZE_LIMIT_GB,
     USE_LANGCHAIN, MAX_PROMPT_LENGTH_CHARS, RECORD_LIMIT_FOR_LARGE_TABLES
 )
-from db import conectar_banco, get_table_schema, get_table_size_and_row_count
+from backends import (
+    importar, modulo_carregado, obter_gerador_sql, pre_aquecer, registrar_tempo_importacao,
+    tempos_importacao
+)
+from db import conectar_banco, carregar_esquema_em_cache, suporta_esquema
+from table_stats import obter_coletor
+from conversa import SessaoConversa
+from schema_model import formatar_tamanho
 from models import verifica_comando_perigoso
 from utils import log_event, validar_prompt, truncate_string_by_chars
+registrar_tempo_importacao("app (imports de topo)", time.perf_counter() - _inicio_imports)
 
-# Importa o cliente LLM apropriado
-if USE_LANGCHAIN:
-    from langchain_client import gerar_sql_com_langchain as gerar_sql_llm
-else:
-    # Note: This will be the direct requests client
-    from llm_client import gerar_sql as gerar_sql_llm
+# Tempo máximo de espera pela primeira coleta de estatísticas no carregamento inicial (segundos)
+STATS_FIRST_LOAD_TIMEOUT_S = 5
 
 st.set_page_config(page_title=STREAMLIT_APP_NAME, layout="wide")
 st.title(STREAMLIT_APP_NAME)
 
 log_event("Aplicação Streamlit iniciada.")
 
+
+def _aquecer_esquema():
+    carregar_esquema_em_cache(conectar_banco)
+
+
+def _aquecer_estatisticas():
+    obter_coletor(conectar_banco)
+
+
+# Importa o driver do banco e o cliente LLM e carrega o esquema em segundo plano (uma vez por processo)
+pre_aquecer(_aquecer_esquema, _aquecer_estatisticas)
+
 # Inicializa o estado da sessão
 if "sql_gerado" not in st.session_state:
     st.session_state.sql_gerado = ""
@@ -30,10 +47,16 @@ if "last_interaction_time" not in st.session_state:
     st.session_state.last_interaction_time = datetime.now()
 if "db_schema_info" not in st.session_state:
     st.session_state.db_schema_info = "Carregando esquema do banco de dados..."
+if "db_schema_model" not in st.session_state:
+    st.session_state.db_schema_model = None
 if "db_table_sizes" not in st.session_state:
     st.session_state.db_table_sizes = {}
+if "db_table_sizes_text" not in st.session_state:
+    st.session_state.db_table_sizes_text = ""
 if "execution_log" not in st.session_state:
     st.session_state.execution_log = []
+if "conversa" not in st.session_state:
+    st.session_state.conversa = SessaoConversa()
 
 # --- Funções de UI e Lógica de Negócios ---
 
@@ -46,14 +69,18 @@ def display_table_info(table_sizes: dict):
         return
 
     st.subheader("Informações de Volume de Dados das Tabelas")
+    pd = importar("pandas")
     table_data = []
     for table, info in table_sizes.items():
         size_gb = info['size_bytes'] / (1024**3) if info['size_bytes'] else 0
+        # O guarda de tabela grande considera o tamanho projetado pela tendência de crescimento
+        projected_gb = info.get('projected_size_bytes', info['size_bytes']) / (1024**3)
         table_data.append({
             "Tabela": table,
             "Tamanho (GB)": f"{size_gb:.2f}",
+            "Projeção 24h (GB)": f"{projected_gb:.2f}",
             "Linhas": f"{info['row_count']:,}",
-            "Status": "Grande" if size_gb > TABLE_SIZE_LIMIT_GB else "Normal"
+            "Status": "Grande" if projected_gb > TABLE_SIZE_LIMIT_GB else "Normal"
         })
     df_table_info = pd.DataFrame(table_data)
     st.dataframe(df_table_info, use_container_width=True)
@@ -61,26 +88,56 @@ def display_table_info(table_sizes: dict):
         f"Tabelas com mais de {TABLE_SIZE_LIMIT_GB} GB terão um LIMIT/TOP {RECORD_LIMIT_FOR_LARGE_TABLES} adicionado automaticamente em consultas SELECT.")
 
 
-def update_db_info():
-    """Conecta ao banco e atualiza o esquema e tamanhos das tabelas."""
-    conn = conectar_banco()
-    if conn:
-        try:
-            st.session_state.db_schema_info = get_table_schema(conn)
-            st.session_state.db_table_sizes = get_table_size_and_row_count(
-                conn)
-            log_event(
-                "Informações do banco de dados atualizadas no estado da sessão.")
-        except Exception as e:
-            st.error(f"Erro ao carregar informações do banco de dados: {e}")
-            log_event(f"Erro ao carregar informações do banco de dados: {e}")
-        finally:
-            if conn:
-                conn.close()
-    else:
-        st.error(
-            "Não foi possível conectar ao banco de dados para obter informações. Verifique as configurações.")
-        log_event("Falha na conexão ao banco de dados ao tentar obter informações.")
+def update_db_info(recarregar: bool = False):
+    """Atualiza o esquema (cache do processo, pré-aquecido em segundo plano) e os tamanhos das tabelas."""
+    if not suporta_esquema():
+        st.session_state.db_schema_info = "Informações do esquema não disponíveis para este tipo de banco de dados."
+        st.warning(f"Leitura do esquema não suportada para o tipo de banco de dados '{DB_TYPE}'.")
+        log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter esquema.")
+        return
+    try:
+        esquema = carregar_esquema_em_cache(conectar_banco, recarregar=recarregar)
+        if esquema is None:
+            st.error(
+                "Não foi possível conectar ao banco de dados para obter informações. Verifique as configurações.")
+            log_event("Falha na conexão ao banco de dados ao tentar obter informações.")
+            return
+        refresh_schema(esquema)
+        # Os tamanhos são coletados em segundo plano; aguarda apenas a primeira passada
+        coletor = obter_coletor(conectar_banco)
+        coletor.aguardar_primeira_coleta(timeout=STATS_FIRST_LOAD_TIMEOUT_S)
+        refresh_table_sizes()
+        log_event(
+            "Informações do banco de dados atualizadas no estado da sessão.")
+    except Exception as e:
+        st.error(f"Erro ao carregar informações do banco de dados: {e}")
+        log_event(f"Erro ao carregar informações do banco de dados: {e}")
+
+
+def refresh_schema(esquema):
+    """Usa o modelo de esquema em cache no processo, renderizando o texto apenas se ele mudou (TTL/recarga)."""
+    if esquema is not None and esquema is not st.session_state.db_schema_model:
+        st.session_state.db_schema_model = esquema
+        st.session_state.db_schema_info = esquema.renderizar_prompt()
+
+
+def refresh_table_sizes():
+    """
+    Atualiza os tamanhos das tabelas a partir do coletor em segundo plano (sem consultar o banco).
+    As estatísticas ficam no estado da sessão; o modelo de esquema é compartilhado e não é alterado.
+    """
+    table_sizes = obter_coletor(conectar_banco).obter_estatisticas()
+    if table_sizes != st.session_state.db_table_sizes:
+        st.session_state.db_table_sizes = table_sizes
+        st.session_state.db_table_sizes_text = "\n".join(
+            formatar_tamanho(table_name, info['size_bytes'], info['row_count'], info.get('projected_size_bytes'))
+            for table_name, info in table_sizes.items()
+        )
+
+
+def table_sizes_text() -> str:
+    """Texto de volume de dados das tabelas para o prompt do LLM (gerado apenas quando as estatísticas mudam)."""
+    return st.session_state.db_table_sizes_text
 
 
 # --- Sidebar para Configurações e Logs ---
@@ -93,6 +150,40 @@ with st.sidebar:
         f"**Modelo LLM:** `{st.session_state.get('llm_model', 'Não configurado')}`")
     st.write(f"**Limite de Prompt (chars):** `{MAX_PROMPT_LENGTH_CHARS}`")
     st.write(f"**Limite de Tabela (GB):** `{TABLE_SIZE_LIMIT_GB}`")
+    recarregar_esquema = st.button("Recarregar esquema", key="reload_schema_button")
+
+    st.subheader("Modo Conversa")
+    modo_conversa = st.checkbox(
+        "Refinar a consulta anterior (ex: 'agora só para 2024')", key="modo_conversa")
+    st.caption(f"Turnos no contexto: {len(st.session_state.conversa)}")
+    if st.button("Nova conversa", key="reset_conversation_button"):
+        st.session_state.conversa.limpar()
+        st.session_state.execution_log.append(
+            f"{datetime.now().strftime('%H:%M:%S')} - Contexto de conversa reiniciado.")
+
+    with st.expander("Tempo de importação (cold start)"):
+        tempos = tempos_importacao()
+        if tempos:
+            for modulo, segundos in tempos.items():
+                st.text(f"{modulo}: {segundos * 1000:.0f} ms")
+        else:
+            st.text("Nenhum módulo carregado sob demanda ainda.")
+
+    if not USE_LANGCHAIN:
+        with st.expander("Roteamento LLM"):
+            # Só lê as métricas se o cliente LLM já foi carregado (não importa o roteador só para a sidebar)
+            llm_router = modulo_carregado("llm_router")
+            if llm_router is None:
+                st.text("Cliente LLM ainda não carregado.")
+            else:
+                metricas = llm_router.obter_roteador().metricas()
+                for nome, info in metricas["backends"].items():
+                    estado = "disponível" if info["disponivel"] else "indisponível"
+                    st.text(f"{nome} ({info['perfil']}): {info['em_uso']}/{info['max_concorrencia']} em uso, "
+                            f"{info['requisicoes']} req., {info['falhas']} falhas, {estado}")
+                st.text(f"Fallbacks: {metricas['fallbacks']}")
+                for decisao in list(metricas["decisoes"])[-5:]:
+                    st.text(f"{decisao['complexidade']} -> {decisao['backend']} ({decisao['latencia_s']:.2f}s)")
 
     st.subheader("Log de Execução")
     # Exibe os últimos 5 logs de execução para feedback rápido
@@ -107,12 +198,20 @@ with st.sidebar:
     """)
 
 # --- Carregar informações do banco de dados na primeira execução ou se não estiverem carregadas ---
-if st.session_state.db_schema_info == "Carregando esquema do banco de dados...":
+if st.session_state.db_schema_info == "Carregando esquema do banco de dados..." or recarregar_esquema:
     with st.spinner("Carregando informações do banco de dados..."):
-        update_db_info()
+        update_db_info(recarregar=recarregar_esquema)
         # Atualiza o modelo LLM exibido na sidebar
         from config import LLM_MODEL
         st.session_state.llm_model = LLM_MODEL
+    if recarregar_esquema:
+        st.session_state.execution_log.append(
+            f"{datetime.now().strftime('%H:%M:%S')} - Esquema recarregado.")
+else:
+    if st.session_state.db_schema_model is not None:
+        # Relido do catálogo em segundo plano quando o TTL do cache expira; o rerun não espera a carga
+        refresh_schema(carregar_esquema_em_cache(conectar_banco))
+    refresh_table_sizes()
 
 # --- Interface Principal ---
 
@@ -138,14 +237,21 @@ if st.button("Converter para SQL", key="convert_button"):
     else:
         with st.spinner("Gerando SQL... Isso pode levar alguns segundos dependendo do seu LLM local."):
             start_time_llm = time.time()
-            generated_sql = gerar_sql_llm(
-                prompt,
-                st.session_state.db_schema_info,
-                "\n".join([
-                    f"Tabela: {table_name}, Tamanho: {info['size_bytes'] / (1024**3):.2f} GB, Linhas: {info['row_count']}"
-                    for table_name, info in st.session_state.db_table_sizes.items()
-                ])
-            )
+            if modo_conversa:
+                generated_sql = obter_gerador_sql(conversa=True)(
+                    prompt,
+                    st.session_state.db_schema_info,
+                    table_sizes_text(),
+                    st.session_state.conversa,
+                    esquema=st.session_state.db_schema_model
+                )
+            else:
+                generated_sql = obter_gerador_sql()(
+                    prompt,
+                    st.session_state.db_schema_info,
+                    table_sizes_text(),
+                    esquema=st.session_state.db_schema_model
+                )
             end_time_llm = time.time()
             llm_duration = end_time_llm - start_time_llm
             st.session_state.execution_log.append(
@@ -210,8 +316,12 @@ if st.session_state.sql_gerado:
                     if st.session_state.sql_gerado.strip().upper().startswith("SELECT"):
                         resultado = cur.fetchall()
                         column_names = [desc[0] for desc in cur.description]
+                        pd = importar("pandas")
                         df_resultado = pd.DataFrame(
                             resultado, columns=column_names)
+                        # Guarda o formato do resultado para os próximos refinamentos
+                        st.session_state.conversa.registrar_resultado(
+                            st.session_state.sql_gerado, column_names, len(resultado))
                         st.success("Consulta executada com sucesso!")
                         st.subheader("Resultado da Consulta")
                         st.dataframe(df_resultado, use_container_width=True)
@@ -0,0 +1,130 @@
+import importlib
+import sys
+import threading
+import time
+
+from config import DB_TYPE, USE_LANGCHAIN
+from utils import log_event
+
+# Módulo do driver DB-API de cada dialeto; só o do DB_TYPE configurado é importado
+DB_DRIVERS = {
+    'postgresql': 'psycopg2',
+    'sqlserver': 'pyodbc',
+    'mysql': 'pymysql',
+    'sqlite': 'sqlite3',
+}
+
+# Cliente LLM: (módulo, função padrão, função do modo conversa), conforme USE_LANGCHAIN
+LLM_CLIENTS = {
+    True: ('langchain_client', 'gerar_sql_com_langchain', 'gerar_sql_com_langchain_conversa'),
+    False: ('llm_client', 'gerar_sql', 'gerar_sql_conversa'),
+}
+
+_import_lock = threading.RLock()
+_tempos_importacao = {}
+_pre_aquecimento = None
+
+
+def importar(nome: str):
+    """
+    Importa um módulo na primeira utilização e registra o tempo gasto.
+
+    O tempo é cumulativo (inclui as dependências ainda não carregadas do módulo). Um módulo que
+    outra thread ainda está importando (já presente em `sys.modules`, mas com o corpo em execução)
+    não é retornado diretamente: `importlib.import_module` aguarda o lock de importação do módulo.
+
+    Args:
+        nome (str): Nome do módulo (ex: 'pandas', 'psycopg2').
+
+    Returns:
+        module: O módulo importado.
+    """
+    modulo = sys.modules.get(nome)
+    if modulo is not None:
+        if not getattr(getattr(modulo, "__spec__", None), "_initializing", False):
+            return modulo
+        # Outra thread está importando o módulo: aguarda sem registrar o tempo de espera
+        return importlib.import_module(nome)
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nome)
+    duracao = time.perf_counter() - inicio
+    with _import_lock:
+        if nome in _tempos_importacao:
+            return modulo
+        _tempos_importacao[nome] = duracao
+    log_event(f"Módulo '{nome}' importado sob demanda em {duracao:.3f}s.")
+    return modulo
+
+
+def modulo_carregado(nome: str):
+    """Retorna o módulo se ele já terminou de ser importado, sem importá-lo; caso contrário None."""
+    modulo = sys.modules.get(nome)
+    if modulo is None or getattr(getattr(modulo, "__spec__", None), "_initializing", False):
+        return None
+    return modulo
+
+
+def obter_driver(db_type: str = DB_TYPE):
+    """
+    Retorna o módulo do driver do dialeto informado, importando-o sob demanda.
+
+    Raises:
+        ValueError: Se o tipo de banco não for suportado.
+    """
+    if db_type not in DB_DRIVERS:
+        raise ValueError(f"Tipo de banco de dados não suportado: {db_type}")
+    return importar(DB_DRIVERS[db_type])
+
+
+def obter_gerador_sql(conversa: bool = False):
+    """
+    Retorna a função de geração de SQL do cliente LLM configurado (API direta ou LangChain),
+    importando o cliente apenas na primeira chamada.
+
+    Args:
+        conversa (bool): Retorna a variante do modo conversa.
+    """
+    modulo, funcao, funcao_conversa = LLM_CLIENTS[bool(USE_LANGCHAIN)]
+    return getattr(importar(modulo), funcao_conversa if conversa else funcao)
+
+
+def tempos_importacao() -> dict[str, float]:
+    """Retorna os tempos de importação sob demanda (segundos), do mais lento para o mais rápido."""
+    with _import_lock:
+        return dict(sorted(_tempos_importacao.items(), key=lambda item: item[1], reverse=True))
+
+
+def registrar_tempo_importacao(nome: str, segundos: float):
+    """Registra o tempo de uma importação feita fora de `importar` (ex: imports de topo do app)."""
+    with _import_lock:
+        _tempos_importacao.setdefault(nome, segundos)
+
+
+def pre_aquecer(*tarefas) -> threading.Thread:
+    """
+    Executa em segundo plano, uma única vez por processo, a importação do driver do banco e do
+    cliente LLM configurados, seguida das tarefas informadas (ex: carregar o cache de esquema).
+
+    Args:
+        *tarefas (callable): Funções sem argumentos executadas após as importações.
+
+    Returns:
+        threading.Thread: A thread de pré-aquecimento (a mesma em chamadas subsequentes).
+    """
+    global _pre_aquecimento
+    with _import_lock:
+        if _pre_aquecimento is not None:
+            return _pre_aquecimento
+
+        def _executar():
+            inicio = time.perf_counter()
+            for etapa in (obter_driver, obter_gerador_sql, *tarefas):
+                try:
+                    etapa()
+                except Exception as e:
+                    log_event(f"Erro no pré-aquecimento ({getattr(etapa, '__name__', etapa)}): {e}")
+            log_event(f"Pré-aquecimento concluído em {time.perf_counter() - inicio:.3f}s.")
+
+        _pre_aquecimento = threading.Thread(target=_executar, name="pre-aquecimento", daemon=True)
+        _pre_aquecimento.start()
+        return _pre_aquecimento
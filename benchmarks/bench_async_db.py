@@ -0,0 +1,119 @@
+"""
+Benchmark do acesso assíncrono ao banco (db_async) comparado ao caminho síncrono (db).
+
+Para cada nível de concorrência, simula N usuários carregando esquema + tamanhos das tabelas:
+  - sync:  uma thread por usuário, consultas em sequência (como o app Streamlit faz hoje);
+  - async: uma tarefa por usuário no mesmo event loop, esquema e tamanhos em paralelo.
+
+Uso:
+    python -m benchmarks.bench_async_db --concurrency 1 4 16 --rounds 5
+    python -m benchmarks.bench_async_db --pg-dsn "dbname=bench user=postgres host=localhost" --output async.json
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixture_db import criar_postgresql, criar_sqlite
+from benchmarks.run_benchmark import _commit_atual, _instalar_config, _resumir
+
+
+def _usuario_sync(conectar_banco, carregar_esquema, get_table_size_and_row_count) -> float:
+    inicio = time.perf_counter()
+    conn = conectar_banco()
+    try:
+        carregar_esquema(conn)
+        get_table_size_and_row_count(conn)
+    finally:
+        conn.close()
+    return time.perf_counter() - inicio
+
+
+async def _usuario_async(carregar_info_banco_async) -> float:
+    inicio = time.perf_counter()
+    await carregar_info_banco_async()
+    return time.perf_counter() - inicio
+
+
+def executar(args) -> dict:
+    """Executa o benchmark e retorna o relatório."""
+    tmp = tempfile.mkdtemp(prefix="nl2sql-bench-async-")
+    config = _instalar_config(args, "http://127.0.0.1:9/api/generate", tmp)
+    if args.pg_dsn:
+        criar_postgresql(args.pg_dsn, args.rows, args.seed, recriar=args.recreate)
+    else:
+        criar_sqlite(config.DB_NAME, args.rows, args.seed)
+
+    from db import carregar_esquema, conectar_banco, get_table_size_and_row_count
+    from db_async import carregar_info_banco_async, conectar_banco_async
+
+    async def _driver_async() -> str | None:
+        conn = await conectar_banco_async()
+        if conn is None:
+            return None
+        await conn.close()
+        return conn.driver
+
+    resultados = {}
+    for concorrencia in args.concurrency:
+        latencias = {"sync": [], "async": []}
+        duracoes = {"sync": [], "async": []}
+        for _ in range(args.rounds):
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+                latencias["sync"] += list(pool.map(
+                    lambda _: _usuario_sync(conectar_banco, carregar_esquema, get_table_size_and_row_count),
+                    range(concorrencia)))
+            duracoes["sync"].append(time.perf_counter() - inicio)
+
+            async def _rodada():
+                return await asyncio.gather(*(_usuario_async(carregar_info_banco_async) for _ in range(concorrencia)))
+
+            inicio = time.perf_counter()
+            latencias["async"] += asyncio.run(_rodada())
+            duracoes["async"].append(time.perf_counter() - inicio)
+
+        resultados[str(concorrencia)] = {
+            modo: {
+                "latency": _resumir(latencias[modo]),
+                "users_per_s": round(concorrencia * len(duracoes[modo]) / sum(duracoes[modo]), 2),
+            }
+            for modo in ("sync", "async")
+        }
+
+    return {
+        "meta": {
+            "commit": _commit_atual(),
+            "db_type": config.DB_TYPE,
+            "async_driver": asyncio.run(_driver_async()),
+            "rows": args.rows,
+            "rounds": args.rounds,
+        },
+        "concurrency": resultados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do acesso assíncrono ao banco.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pg-dsn", help="Usa um PostgreSQL local em vez do SQLite.")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Apaga e recria as tabelas da fixture se o banco do --pg-dsn já tiver tabelas.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout).")
+    args = parser.parse_args()
+
+    texto = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
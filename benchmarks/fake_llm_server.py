@@ -0,0 +1,204 @@
+"""
+Servidor LLM falso para benchmarks.
+
+Imita os contratos usados por `llm_client.gerar_sql`:
+  - Ollama:    POST /api/generate    -> {"response": ..., "done": true, "context": [...]}
+                                        (com "stream": true, uma linha JSON por token)
+               GET  /api/tags        -> verificação de saúde
+  - LM Studio: POST /v1/completions  -> {"choices": [{"text": ...}]}
+                                        (com "stream": true, eventos SSE "data: ..." e "data: [DONE]")
+               GET  /v1/models       -> verificação de saúde
+
+Uso:
+    python -m benchmarks.fake_llm_server --port 11434 --latency-ms 200 --token-ms 5
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SQL_RESPONSE = (
+    "```sql\n"
+    "-- Seleciona os 10 clientes mais recentes\n"
+    "SELECT id, nome, criado_em\n"
+    "FROM clientes\n"
+    "ORDER BY criado_em DESC\n"
+    "LIMIT 10;\n"
+    "```"
+)
+
+
+class FakeLLMServer:
+    """
+    Servidor HTTP em thread própria com latência configurável.
+
+    Args:
+        host (str): Endereço de escuta.
+        port (int): Porta de escuta (0 escolhe uma porta livre).
+        latency_ms (float): Atraso antes do primeiro token (simula o processamento do prompt).
+        token_ms (float): Atraso entre tokens (simula a geração).
+        response_text (str): Texto devolvido em todas as requisições.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 token_ms: float = 0.0, response_text: str = DEFAULT_SQL_RESPONSE):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.response_text = response_text
+        self.requests_served = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._criar_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ollama_url(self) -> str:
+        return f"{self.base_url}/api/generate"
+
+    @property
+    def lmstudio_url(self) -> str:
+        return f"{self.base_url}/v1/completions"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _tokens(self) -> list[str]:
+        # Aproximação: cada "token" é uma palavra seguida do espaço/quebra de linha original
+        tokens, atual = [], ""
+        for ch in self.response_text:
+            atual += ch
+            if ch in " \n":
+                tokens.append(atual)
+                atual = ""
+        if atual:
+            tokens.append(atual)
+        return tokens
+
+    def _criar_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # Silencia o log padrão do http.server
+
+            def do_GET(self):
+                if self.path.endswith("/api/tags"):
+                    self._responder_json(200, {"models": [{"name": "fake-model"}]})
+                elif self.path.endswith("/v1/models"):
+                    self._responder_json(200, {"object": "list", "data": [{"id": "fake-model"}]})
+                else:
+                    self._responder_json(404, {"error": f"unknown path {self.path}"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._responder_json(400, {"error": "invalid json"})
+                    return
+                with server._lock:
+                    server.requests_served += 1
+                    server.prompt_chars += len(payload.get("prompt", ""))
+
+                if self.path.endswith("/api/generate"):
+                    self._ollama(payload)
+                elif self.path.endswith("/v1/completions"):
+                    self._lmstudio(payload)
+                else:
+                    self._responder_json(404, {"error": f"unknown path {self.path}"})
+
+            def _responder_json(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _iniciar_stream(self, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _gerar(self):
+                time.sleep(server.latency_ms / 1000)
+                for token in server._tokens():
+                    if server.token_ms:
+                        time.sleep(server.token_ms / 1000)
+                    yield token
+
+            def _ollama(self, payload: dict):
+                # Contexto crescente, como o Ollama devolve após cada geração
+                contexto = list(payload.get("context") or []) + list(range(len(payload.get("prompt", "")) // 4))
+                if payload.get("stream", True):
+                    self._iniciar_stream("application/x-ndjson")
+                    for token in self._gerar():
+                        self._chunk(json.dumps({"model": payload.get("model"), "response": token, "done": False}).encode() + b"\n")
+                    self._chunk(json.dumps({"model": payload.get("model"), "response": "", "done": True,
+                                            "context": contexto}).encode() + b"\n")
+                    self._chunk(b"")
+                else:
+                    texto = "".join(self._gerar())
+                    self._responder_json(200, {"model": payload.get("model"), "response": texto, "done": True,
+                                               "context": contexto})
+
+            def _lmstudio(self, payload: dict):
+                if payload.get("stream", False):
+                    self._iniciar_stream("text/event-stream")
+                    for token in self._gerar():
+                        evento = {"object": "text_completion", "choices": [{"index": 0, "text": token}]}
+                        self._chunk(f"data: {json.dumps(evento)}\n\n".encode())
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                else:
+                    texto = "".join(self._gerar())
+                    self._responder_json(200, {"object": "text_completion", "model": payload.get("model"),
+                                               "choices": [{"index": 0, "text": texto, "finish_reason": "stop"}]})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM falso (Ollama / LM Studio) para benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Atraso antes do primeiro token.")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Atraso entre tokens.")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency_ms, args.token_ms)
+    print(f"Servidor LLM falso em {server.base_url} (Ollama: {server.ollama_url}, LM Studio: {server.lmstudio_url})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
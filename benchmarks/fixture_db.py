@@ -0,0 +1,143 @@
+"""
+Banco de dados de fixture para benchmarks, com dados gerados de forma reprodutível (semente fixa).
+
+Cria as tabelas `clientes`, `produtos` e `pedidos` (com PK, FK e índices) em um arquivo SQLite
+ou, se informado um DSN, em um PostgreSQL local (requer psycopg2).
+"""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+_DDL = [
+    """
+    CREATE TABLE clientes (
+        id INTEGER PRIMARY KEY,
+        nome VARCHAR(100) NOT NULL,
+        email VARCHAR(150) NOT NULL,
+        cidade VARCHAR(80),
+        criado_em TIMESTAMP NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE produtos (
+        id INTEGER PRIMARY KEY,
+        descricao VARCHAR(120) NOT NULL,
+        categoria VARCHAR(40) NOT NULL,
+        preco NUMERIC(10, 2) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE pedidos (
+        id INTEGER PRIMARY KEY,
+        cliente_id INTEGER NOT NULL REFERENCES clientes(id),
+        produto_id INTEGER NOT NULL REFERENCES produtos(id),
+        quantidade INTEGER NOT NULL,
+        total NUMERIC(12, 2) NOT NULL,
+        criado_em TIMESTAMP NOT NULL
+    )
+    """,
+    "CREATE INDEX ix_clientes_criado_em ON clientes (criado_em)",
+    "CREATE UNIQUE INDEX ux_clientes_email ON clientes (email)",
+    "CREATE INDEX ix_pedidos_cliente ON pedidos (cliente_id, criado_em)",
+]
+
+_CIDADES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre", "Recife", "Salvador"]
+_CATEGORIAS = ["eletrônicos", "livros", "casa", "esportes", "moda"]
+
+
+def gerar_linhas(clientes: int, seed: int = 42) -> dict[str, list[tuple]]:
+    """
+    Gera as linhas das tabelas de fixture.
+
+    Args:
+        clientes (int): Quantidade de clientes; produtos = clientes / 10 e pedidos = clientes * 5.
+        seed (int): Semente do gerador aleatório.
+
+    Returns:
+        dict[str, list[tuple]]: Linhas por tabela, na ordem das colunas do DDL.
+    """
+    rnd = random.Random(seed)
+    inicio = datetime(2023, 1, 1)
+    n_produtos = max(1, clientes // 10)
+    linhas_clientes = [
+        (i, f"Cliente {i}", f"cliente{i}@exemplo.com", rnd.choice(_CIDADES),
+         inicio + timedelta(minutes=rnd.randrange(0, 2 * 365 * 24 * 60)))
+        for i in range(1, clientes + 1)
+    ]
+    linhas_produtos = [
+        (i, f"Produto {i}", rnd.choice(_CATEGORIAS), round(rnd.uniform(5, 2000), 2))
+        for i in range(1, n_produtos + 1)
+    ]
+    linhas_pedidos = []
+    for i in range(1, clientes * 5 + 1):
+        produto = rnd.randrange(1, n_produtos + 1)
+        quantidade = rnd.randint(1, 5)
+        linhas_pedidos.append((
+            i, rnd.randrange(1, clientes + 1), produto, quantidade,
+            round(linhas_produtos[produto - 1][3] * quantidade, 2),
+            inicio + timedelta(minutes=rnd.randrange(0, 2 * 365 * 24 * 60)),
+        ))
+    return {"clientes": linhas_clientes, "produtos": linhas_produtos, "pedidos": linhas_pedidos}
+
+
+def _popular(conn, placeholder: str, clientes: int, seed: int):
+    cursor = conn.cursor()
+    for tabela in ("pedidos", "produtos", "clientes"):
+        cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+    for ddl in _DDL:
+        cursor.execute(ddl)
+    for tabela, linhas in gerar_linhas(clientes, seed).items():
+        if not linhas:
+            continue
+        marcadores = ", ".join([placeholder] * len(linhas[0]))
+        cursor.executemany(f"INSERT INTO {tabela} VALUES ({marcadores})", linhas)
+    conn.commit()
+    cursor.close()
+
+
+def criar_sqlite(caminho: str, clientes: int = 1000, seed: int = 42) -> str:
+    """
+    Cria (ou recria) o banco de fixture em um arquivo SQLite.
+
+    Returns:
+        str: O caminho do arquivo criado.
+    """
+    conn = sqlite3.connect(caminho)
+    try:
+        _popular(conn, "?", clientes, seed)
+    finally:
+        conn.close()
+    return caminho
+
+
+def criar_postgresql(dsn: str, clientes: int = 1000, seed: int = 42, recriar: bool = False):
+    """
+    Cria o banco de fixture no schema public de um PostgreSQL local e executa ANALYZE.
+    O schema public precisa estar vazio, a menos que `recriar` seja True: nesse caso as tabelas
+    `clientes`, `produtos` e `pedidos` existentes são apagadas.
+
+    Args:
+        dsn (str): String de conexão do psycopg2 (ex: "dbname=bench user=postgres host=localhost").
+        recriar (bool): Permite apagar e recriar as tabelas da fixture em um banco que já tem tabelas.
+
+    Raises:
+        RuntimeError: Se o schema public já tiver tabelas e `recriar` for False.
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public' ORDER BY tablename")
+        existentes = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        if existentes and not recriar:
+            raise RuntimeError(
+                f"O schema public do banco de fixture não está vazio ({', '.join(existentes[:5])}"
+                f"{', ...' if len(existentes) > 5 else ''}); use um banco dedicado ou --recreate."
+            )
+        _popular(conn, "%s", clientes, seed)
+        conn.autocommit = True
+        conn.cursor().execute("ANALYZE")
+    finally:
+        conn.close()
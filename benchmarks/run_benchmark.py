@@ -0,0 +1,274 @@
+"""
+Benchmark do pipeline LN -> SQL com substitutos locais (servidor LLM falso + banco de fixture).
+
+Mede latência e vazão por etapa (esquema, montagem do prompt, geração, verificação de segurança,
+execução e montagem do DataFrame) e de ponta a ponta, e gera um relatório JSON comparável entre commits.
+
+Uso:
+    python -m benchmarks.run_benchmark --iterations 50 --rows 10000 --output bench.json
+    python -m benchmarks.run_benchmark --api lmstudio --latency-ms 150 --token-ms 3 --stream
+    python -m benchmarks.run_benchmark --pg-dsn "dbname=bench user=postgres host=localhost"
+    python -m benchmarks.run_benchmark --compare base.json novo.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timezone
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from benchmarks.fixture_db import criar_postgresql, criar_sqlite
+
+BENCH_PROMPT = "Me mostre os 10 clientes mais recentes com nome e data de cadastro"
+REPORT_FORMAT_VERSION = 1
+
+
+def _instalar_config(args, llm_url: str, log_dir: str) -> types.ModuleType:
+    """
+    Registra um módulo `config` próprio do benchmark antes de importar os módulos da aplicação,
+    apontando para o servidor LLM falso e para o banco de fixture.
+    """
+    config = types.ModuleType("config")
+    config.STREAMLIT_APP_NAME = "Benchmark"
+    config.LOG_PATH = os.path.join(log_dir, "app.log")
+    config.LLM_API_URL = llm_url
+    config.LLM_MODEL = "fake-model"
+    config.USE_LANGCHAIN = False
+    config.MAX_PROMPT_LENGTH_CHARS = 2000
+    config.MAX_SQL_RESPONSE_LENGTH_CHARS = 4000
+    config.TABLE_SIZE_LIMIT_GB = 1
+    config.RECORD_LIMIT_FOR_LARGE_TABLES = 1000
+    config.DB_HOST = config.DB_USER = config.DB_PASSWORD = ""
+    config.DB_PORT = 0
+    if args.pg_dsn:
+        import psycopg2.extensions
+
+        dsn = psycopg2.extensions.parse_dsn(args.pg_dsn)
+        config.DB_TYPE = "postgresql"
+        config.DB_HOST = dsn.get("host", "localhost")
+        config.DB_PORT = int(dsn.get("port", 5432))
+        config.DB_USER = dsn.get("user", "")
+        config.DB_PASSWORD = dsn.get("password", "")
+        config.DB_NAME = dsn.get("dbname", "")
+    else:
+        config.DB_TYPE = "sqlite"
+        config.DB_NAME = os.path.join(log_dir, "fixture.sqlite3")
+    sys.modules["config"] = config
+    return config
+
+
+def _resumir(amostras: list[float]) -> dict:
+    ordenadas = sorted(amostras)
+    media = statistics.fmean(ordenadas)
+    return {
+        "n": len(ordenadas),
+        "mean_ms": round(media * 1000, 4),
+        "p50_ms": round(ordenadas[len(ordenadas) // 2] * 1000, 4),
+        "p95_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))] * 1000, 4),
+        "min_ms": round(ordenadas[0] * 1000, 4),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+        "ops_per_s": round(1 / media, 2) if media > 0 else None,
+    }
+
+
+def _commit_atual() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _medir_stream(url: str, api: str) -> tuple[float, float]:
+    """Mede o tempo até o primeiro token e o tempo total de uma geração em streaming."""
+    import requests
+
+    payload = {"model": "fake-model", "prompt": BENCH_PROMPT, "stream": True}
+    inicio = time.perf_counter()
+    primeiro = None
+    with requests.post(url, json=payload, stream=True, timeout=120) as response:
+        response.raise_for_status()
+        for linha in response.iter_lines():
+            if not linha:
+                continue
+            if primeiro is None:
+                primeiro = time.perf_counter() - inicio
+            if api == "lmstudio" and linha == b"data: [DONE]":
+                break
+    return primeiro or 0.0, time.perf_counter() - inicio
+
+
+def executar(args) -> dict:
+    """Executa o benchmark e retorna o relatório."""
+    tmp = tempfile.mkdtemp(prefix="nl2sql-bench-")
+    server = FakeLLMServer(latency_ms=args.latency_ms, token_ms=args.token_ms).start()
+    try:
+        llm_url = server.ollama_url if args.api == "ollama" else server.lmstudio_url
+        config = _instalar_config(args, llm_url, tmp)
+        if args.pg_dsn:
+            criar_postgresql(args.pg_dsn, args.rows, args.seed, recriar=args.recreate)
+        else:
+            criar_sqlite(config.DB_NAME, args.rows, args.seed)
+
+        # Importados apenas depois do `config` do benchmark estar registrado; o tempo de cada
+        # importação entra no relatório para acompanhar o cold start
+        importacoes = {}
+        t = time.perf_counter()
+        from db import conectar_banco, get_table_schema
+        importacoes["db"] = time.perf_counter() - t
+        t = time.perf_counter()
+        from llm_client import gerar_sql, montar_prompt
+        importacoes["llm_client"] = time.perf_counter() - t
+        t = time.perf_counter()
+        from models import verifica_comando_perigoso
+        importacoes["models"] = time.perf_counter() - t
+        from backends import importar, tempos_importacao
+        from llm_router import obter_roteador
+        try:
+            pd = importar("pandas")
+        except ImportError:
+            pd = None
+
+        etapas = {nome: [] for nome in (
+            "connect", "get_table_schema", "prompt_build", "generation", "verifica_comando_perigoso",
+            "execution", "dataframe_build", "end_to_end")}
+        if args.stream:
+            etapas["stream_first_token"] = []
+            etapas["stream_total"] = []
+        table_sizes_info = ""
+
+        for i in range(args.warmup + args.iterations):
+            medir = i >= args.warmup
+            tempos = {}
+            inicio_total = time.perf_counter()
+
+            t = time.perf_counter()
+            conn = conectar_banco()
+            tempos["connect"] = time.perf_counter() - t
+            if conn is None:
+                raise RuntimeError("Não foi possível conectar ao banco de fixture.")
+            try:
+                t = time.perf_counter()
+                schema_info = get_table_schema(conn)
+                tempos["get_table_schema"] = time.perf_counter() - t
+
+                t = time.perf_counter()
+                montar_prompt(BENCH_PROMPT, schema_info, table_sizes_info)
+                tempos["prompt_build"] = time.perf_counter() - t
+
+                t = time.perf_counter()
+                sql = gerar_sql(BENCH_PROMPT, schema_info, table_sizes_info)
+                tempos["generation"] = time.perf_counter() - t
+
+                t = time.perf_counter()
+                verifica_comando_perigoso(sql)
+                tempos["verifica_comando_perigoso"] = time.perf_counter() - t
+
+                t = time.perf_counter()
+                cur = conn.cursor()
+                cur.execute(sql)
+                resultado = cur.fetchall()
+                column_names = [desc[0] for desc in cur.description]
+                cur.close()
+                tempos["execution"] = time.perf_counter() - t
+
+                if pd is not None:
+                    t = time.perf_counter()
+                    pd.DataFrame(resultado, columns=column_names)
+                    tempos["dataframe_build"] = time.perf_counter() - t
+            finally:
+                conn.close()
+            tempos["end_to_end"] = time.perf_counter() - inicio_total
+
+            if args.stream:
+                tempos["stream_first_token"], tempos["stream_total"] = _medir_stream(llm_url, args.api)
+
+            if medir:
+                for nome, valor in tempos.items():
+                    etapas[nome].append(valor)
+
+        return {
+            "format_version": REPORT_FORMAT_VERSION,
+            "meta": {
+                "commit": _commit_atual(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "db_type": config.DB_TYPE,
+                "api": args.api,
+                "iterations": args.iterations,
+                "warmup": args.warmup,
+                "rows": args.rows,
+                "seed": args.seed,
+                "latency_ms": args.latency_ms,
+                "token_ms": args.token_ms,
+                "llm_requests": server.requests_served,
+                "pandas": pd is not None,
+            },
+            "llm_routing": obter_roteador().metricas()["backends"],
+            "import_times_ms": {
+                nome: round(segundos * 1000, 3)
+                for nome, segundos in {**importacoes, **tempos_importacao()}.items()
+            },
+            "stages": {nome: _resumir(valores) for nome, valores in etapas.items() if valores},
+        }
+    finally:
+        server.stop()
+
+
+def comparar(base: dict, novo: dict) -> dict:
+    """
+    Compara dois relatórios e retorna a variação percentual da média e do p95 por etapa
+    (valores positivos indicam regressão).
+    """
+    diferencas = {}
+    for nome, stats in novo["stages"].items():
+        anterior = base["stages"].get(nome)
+        if not anterior:
+            continue
+        diferencas[nome] = {
+            campo: round((stats[campo] - anterior[campo]) / anterior[campo] * 100, 2) if anterior[campo] else None
+            for campo in ("mean_ms", "p95_ms")
+        }
+    return {"base": base["meta"].get("commit"), "novo": novo["meta"].get("commit"), "delta_pct": diferencas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline LN -> SQL.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=1000, help="Quantidade de clientes na fixture (pedidos = 5x).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--api", choices=("ollama", "lmstudio"), default="ollama")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Atraso do servidor LLM falso antes do primeiro token.")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Atraso do servidor LLM falso entre tokens.")
+    parser.add_argument("--stream", action="store_true", help="Mede também o tempo até o primeiro token em streaming.")
+    parser.add_argument("--pg-dsn", help="Usa um PostgreSQL local em vez do SQLite (requer psycopg2).")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Apaga e recria as tabelas da fixture se o banco do --pg-dsn já tiver tabelas.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois relatórios JSON.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f_base, open(args.compare[1], encoding="utf-8") as f_novo:
+            relatorio = comparar(json.load(f_base), json.load(f_novo))
+    else:
+        relatorio = executar(args)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+from collections import deque
+
+from utils import log_event, truncate_string_by_chars
+
+# Número máximo de turnos mantidos no histórico compacto da conversa
+MAX_CONVERSATION_TURNS = 6
+# Tamanho máximo do SQL anterior repetido no prompt incremental (caracteres)
+MAX_PREVIOUS_SQL_CHARS = 1200
+# Limites do contexto do Ollama reaproveitado entre turnos (tokens e turnos desde o último prefixo completo).
+# Acima deles o contexto é descartado e o prefixo é reenviado, antes que o Ollama corte o início
+# (o esquema) ao passar de num_ctx
+MAX_OLLAMA_CONTEXT_TOKENS = 3072
+MAX_OLLAMA_CONTEXT_TURNS = 4
+
+
+class Turno:
+    """Um par pergunta/SQL da conversa e o formato do resultado, quando executado."""
+    __slots__ = ("prompt", "sql", "colunas", "linhas")
+
+    def __init__(self, prompt: str, sql: str):
+        self.prompt = prompt
+        self.sql = sql
+        self.colunas = None
+        self.linhas = None
+
+    def resumo_resultado(self) -> str:
+        if self.colunas is None:
+            return "não executado"
+        return f"{self.linhas} linhas; colunas: {', '.join(self.colunas)}"
+
+
+class SessaoConversa:
+    """
+    Contexto de conversa por sessão para refinamentos incrementais ("agora só para 2024").
+
+    Guarda um histórico compacto dos turnos e a referência ao prefixo já processado pelo LLM:
+    os tokens de `context` do Ollama e o backend que os gerou (API direta) ou a lista de
+    mensagens do chat (LangChain).
+    O prefixo é identificado por um hash do esquema (os tamanhos mudam a cada coleta de estatísticas e
+    não entram no hash). Se o esquema mudar, apenas o contexto em cache no LLM é descartado: os turnos
+    são mantidos e o próximo refinamento reenvia o prefixo completo com o SQL anterior.
+    """
+    __slots__ = ("turnos", "contexto_ollama", "backend_llm", "turnos_contexto", "mensagens", "_hash_prefixo")
+
+    def __init__(self):
+        self.turnos = deque(maxlen=MAX_CONVERSATION_TURNS)
+        self.contexto_ollama = None
+        self.backend_llm = None
+        self.turnos_contexto = 0
+        self.mensagens = []
+        self._hash_prefixo = None
+
+    def __len__(self):
+        return len(self.turnos)
+
+    def limpar(self):
+        """Descarta o histórico e a referência ao prefixo em cache."""
+        self.turnos.clear()
+        self.contexto_ollama = None
+        self.backend_llm = None
+        self.turnos_contexto = 0
+        self.mensagens = []
+        self._hash_prefixo = None
+        log_event("Contexto de conversa reiniciado.")
+
+    def preparar_prefixo(self, schema_info: str) -> bool:
+        """
+        Verifica se o prefixo em cache no LLM ainda corresponde ao esquema atual, descartando
+        o contexto do Ollama e as mensagens do chat (mas não os turnos) se ele mudou.
+
+        Returns:
+            bool: True se há turnos anteriores e o próximo prompt é um refinamento; False se é
+                  o primeiro turno e precisa levar o contexto completo.
+        """
+        hash_atual = hashlib.sha1(schema_info.encode("utf-8")).hexdigest()
+        if self._hash_prefixo is not None and self._hash_prefixo != hash_atual:
+            log_event("Esquema alterado; descartando o contexto do LLM e mantendo os turnos da conversa.")
+            self.contexto_ollama = None
+            self.backend_llm = None
+            self.turnos_contexto = 0
+            self.mensagens = []
+        self._hash_prefixo = hash_atual
+        return bool(self.turnos)
+
+    def contexto_reaproveitavel(self) -> bool:
+        """
+        Indica se o próximo turno pode usar o contexto do Ollama. Se ele passou de
+        MAX_OLLAMA_CONTEXT_TOKENS ou MAX_OLLAMA_CONTEXT_TURNS, é descartado para que o prefixo seja reenviado.
+        """
+        if not self.contexto_ollama:
+            return False
+        if len(self.contexto_ollama) > MAX_OLLAMA_CONTEXT_TOKENS or self.turnos_contexto >= MAX_OLLAMA_CONTEXT_TURNS:
+            log_event(f"Contexto do Ollama no limite ({len(self.contexto_ollama)} tokens, {self.turnos_contexto} turnos); "
+                      "reenviando o prefixo completo.")
+            self.contexto_ollama = None
+            self.turnos_contexto = 0
+            return False
+        return True
+
+    def registrar_contexto(self, contexto: list[int] | None, backend: str, reaproveitado: bool):
+        """Guarda o contexto devolvido pelo LLM; `reaproveitado` indica se o pedido partiu do contexto anterior."""
+        self.contexto_ollama = contexto
+        self.backend_llm = backend
+        if not contexto:
+            self.turnos_contexto = 0
+        elif reaproveitado:
+            self.turnos_contexto += 1
+        else:
+            self.turnos_contexto = 1
+
+    def registrar_turno(self, prompt: str, sql: str):
+        self.turnos.append(Turno(prompt, sql))
+
+    def registrar_resultado(self, sql: str, colunas: list[str], linhas: int):
+        """Anota o formato do resultado no turno mais recente, se o SQL executado for o dele."""
+        if self.turnos and self.turnos[-1].sql == sql:
+            self.turnos[-1].colunas = list(colunas)
+            self.turnos[-1].linhas = linhas
+
+    @property
+    def ultimo_turno(self) -> Turno | None:
+        return self.turnos[-1] if self.turnos else None
+
+    def montar_delta(self, prompt: str, incluir_sql: bool = True) -> str:
+        """
+        Monta apenas o trecho novo do prompt para um refinamento: o SQL anterior,
+        o formato do resultado e a nova solicitação.
+
+        Args:
+            prompt (str): A nova instrução em linguagem natural.
+            incluir_sql (bool): Repete o SQL anterior; desnecessário quando o LLM já o tem
+                                no contexto (tokens do Ollama ou histórico de mensagens).
+        """
+        ultimo = self.ultimo_turno
+        sql_anterior = ""
+        if incluir_sql:
+            sql_anterior = f"""
+    SQL anterior:
+    ```sql
+    {truncate_string_by_chars(ultimo.sql, MAX_PREVIOUS_SQL_CHARS)}
+    ```"""
+        return f"""
+    **Refinamento da consulta anterior.**{sql_anterior}
+    Resultado anterior: {ultimo.resumo_resultado()}
+
+    **Nova Solicitação do Usuário (ajuste o SQL anterior):**
+    {prompt}
+
+    **Instrução SQL Gerada (comentada e otimizada):**
+    ```sql
+    """
@@ -1,27 +1,22 @@
-import psycopg2
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+import threading
+import time
+from backends import obter_driver
+from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_TYPE
+from schema_model import ChaveEstrangeira, Coluna, EsquemaBanco, Indice
+from table_stats import montar_consulta_estatisticas, montar_estatisticas, suporta_estatisticas, usar_catalogo_sem_dmv
 from utils import log_event
 
+# Tempo de validade do modelo de esquema em cache; depois dele o catálogo é relido em segundo plano (segundos)
+SCHEMA_CACHE_TTL_S = 600
+# Espera após a primeira falha de releitura; dobra a cada falha seguida, até SCHEMA_CACHE_TTL_S (segundos)
+SCHEMA_RELOAD_BACKOFF_S = 15
 
-def conectar_banco():
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            dbname=DB_NAME
-        )
-        log_event("Conexão com o banco estabelecida.")
-        return conn
-    except psycopg2.Error as e:
-        log_event(f"Erro ao conectar ao banco: {e}")
-        return None
-import psycopg2
-import pymysql
-import pyodbc # Para SQL Server
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_TYPE
-from utils import log_event
+# Cache do modelo de esquema compartilhado pelo processo (ver carregar_esquema_em_cache)
+_esquema_cache = None
+_esquema_cache_expira_em = 0.0
+_esquema_cache_falhas = 0
+_esquema_cache_recarga = None
+_esquema_cache_lock = threading.Lock()
 
 def conectar_banco():
     """
@@ -32,8 +27,9 @@ def conectar_banco():
     """
     conn = None
     try:
+        # Apenas o driver do dialeto configurado é importado (na primeira conexão)
         if DB_TYPE == 'postgresql':
-            conn = psycopg2.connect(
+            conn = obter_driver().connect(
                 host=DB_HOST,
                 port=DB_PORT,
                 user=DB_USER,
@@ -52,10 +48,10 @@ def conectar_banco():
                 f"UID={DB_USER};"
                 f"PWD={DB_PASSWORD}"
             )
-            conn = pyodbc.connect(conn_str)
+            conn = obter_driver().connect(conn_str)
             log_event(f"Conexão SQL Server estabelecida com {DB_NAME}.")
         elif DB_TYPE == 'mysql':
-            conn = pymysql.connect(
+            conn = obter_driver().connect(
                 host=DB_HOST,
                 port=DB_PORT,
                 user=DB_USER,
@@ -63,6 +59,10 @@ def conectar_banco():
                 database=DB_NAME
             )
             log_event(f"Conexão MySQL estabelecida com {DB_NAME}.")
+        elif DB_TYPE == 'sqlite':
+            # SQLite é usado para desenvolvimento local e benchmarks; DB_NAME é o caminho do arquivo
+            conn = obter_driver().connect(DB_NAME, check_same_thread=False)
+            log_event(f"Conexão SQLite estabelecida com {DB_NAME}.")
         else:
             log_event(f"Tipo de banco de dados não suportado: {DB_TYPE}")
             return None
@@ -71,6 +71,309 @@ def conectar_banco():
         log_event(f"Erro ao conectar ao banco de dados {DB_TYPE}: {e}")
         return None
 
+# Consultas de catálogo usadas para montar o modelo de esquema (schema_model.EsquemaBanco).
+# Formato das linhas:
+#   colunas:  (tabela, coluna, tipo, anulável)
+#   pk:       (tabela, coluna)                                   ordenado pela posição na chave
+#   fk:       (constraint, tabela, coluna, tabela_ref, coluna_ref) ordenado pela posição na chave
+#   indices:  (tabela, índice, único, coluna)                     ordenado pela posição no índice
+# As consultas do MySQL recebem o nome do banco como parâmetro.
+_CATALOGO_SQL = {
+    'postgresql': {
+        'colunas': """
+            SELECT table_name, column_name, data_type, is_nullable = 'YES'
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+            ORDER BY table_name, ordinal_position;
+        """,
+        'pk': """
+            SELECT cl.relname, att.attname
+            FROM pg_constraint con
+            JOIN pg_class cl ON cl.oid = con.conrelid
+            CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = k.attnum
+            WHERE con.contype = 'p'
+              AND cl.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
+            ORDER BY cl.relname, k.ord;
+        """,
+        'fk': """
+            SELECT con.conname, cl.relname, att.attname, fcl.relname, fatt.attname
+            FROM pg_constraint con
+            JOIN pg_class cl ON cl.oid = con.conrelid
+            JOIN pg_class fcl ON fcl.oid = con.confrelid
+            CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord)
+            JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = k.attnum
+            JOIN pg_attribute fatt ON fatt.attrelid = con.confrelid AND fatt.attnum = k.fattnum
+            WHERE con.contype = 'f'
+              AND cl.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
+            ORDER BY cl.relname, con.conname, k.ord;
+        """,
+        'indices': """
+            SELECT t.relname, i.relname, ix.indisunique, a.attname
+            FROM pg_index ix
+            JOIN pg_class t ON t.oid = ix.indrelid
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+            WHERE NOT ix.indisprimary
+              AND t.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
+            ORDER BY t.relname, i.relname, k.ord;
+        """,
+    },
+    'sqlserver': {
+        'colunas': """
+            SELECT t.name, c.name, ty.name, c.is_nullable
+            FROM sys.tables t
+            INNER JOIN sys.columns c ON t.object_id = c.object_id
+            INNER JOIN sys.types ty ON c.user_type_id = ty.user_type_id
+            ORDER BY t.name, c.column_id;
+        """,
+        'pk': """
+            SELECT t.name, c.name
+            FROM sys.indexes i
+            INNER JOIN sys.tables t ON t.object_id = i.object_id
+            INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+            INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+            WHERE i.is_primary_key = 1
+            ORDER BY t.name, ic.key_ordinal;
+        """,
+        'fk': """
+            SELECT fk.name, t.name, c.name, rt.name, rc.name
+            FROM sys.foreign_keys fk
+            INNER JOIN sys.foreign_key_columns fkc ON fkc.constraint_object_id = fk.object_id
+            INNER JOIN sys.tables t ON t.object_id = fkc.parent_object_id
+            INNER JOIN sys.columns c ON c.object_id = fkc.parent_object_id AND c.column_id = fkc.parent_column_id
+            INNER JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+            INNER JOIN sys.columns rc ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+            ORDER BY t.name, fk.name, fkc.constraint_column_id;
+        """,
+        'indices': """
+            SELECT t.name, i.name, i.is_unique, c.name
+            FROM sys.indexes i
+            INNER JOIN sys.tables t ON t.object_id = i.object_id
+            INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+            INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+            WHERE i.is_primary_key = 0 AND i.type > 0 AND ic.is_included_column = 0
+            ORDER BY t.name, i.name, ic.key_ordinal;
+        """,
+    },
+    'mysql': {
+        'colunas': """
+            SELECT table_name, column_name, data_type, is_nullable = 'YES'
+            FROM information_schema.columns
+            WHERE table_schema = %s
+            ORDER BY table_name, ordinal_position;
+        """,
+        'pk': """
+            SELECT table_name, column_name
+            FROM information_schema.key_column_usage
+            WHERE table_schema = %s AND constraint_name = 'PRIMARY'
+            ORDER BY table_name, ordinal_position;
+        """,
+        'fk': """
+            SELECT constraint_name, table_name, column_name, referenced_table_name, referenced_column_name
+            FROM information_schema.key_column_usage
+            WHERE table_schema = %s AND referenced_table_name IS NOT NULL
+            ORDER BY table_name, constraint_name, ordinal_position;
+        """,
+        'indices': """
+            SELECT table_name, index_name, non_unique = 0, column_name
+            FROM information_schema.statistics
+            WHERE table_schema = %s AND index_name <> 'PRIMARY'
+            ORDER BY table_name, index_name, seq_in_index;
+        """,
+    },
+    'sqlite': {
+        'colunas': """
+            SELECT m.name, p.name, p.type, p."notnull" = 0
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.name, p.cid;
+        """,
+        'pk': """
+            SELECT m.name, p.name
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND p.pk > 0
+            ORDER BY m.name, p.pk;
+        """,
+        'fk': """
+            SELECT m.name || '_fk' || f.id, m.name, f."from", f."table", f."to"
+            FROM sqlite_master m
+            JOIN pragma_foreign_key_list(m.name) f
+            WHERE m.type = 'table'
+            ORDER BY m.name, f.id, f.seq;
+        """,
+        'indices': """
+            SELECT m.name, il.name, il."unique", ii.name
+            FROM sqlite_master m
+            JOIN pragma_index_list(m.name) il
+            JOIN pragma_index_info(il.name) ii
+            WHERE m.type = 'table' AND il.origin <> 'pk'
+            ORDER BY m.name, il.name, ii.seqno;
+        """,
+    },
+}
+
+
+def _executar_catalogo(cursor, consulta: str) -> list:
+    """Executa uma consulta de catálogo do dialeto configurado e retorna todas as linhas."""
+    if DB_TYPE == 'mysql':
+        cursor.execute(_CATALOGO_SQL[DB_TYPE][consulta], (DB_NAME,))
+    else:
+        cursor.execute(_CATALOGO_SQL[DB_TYPE][consulta])
+    return cursor.fetchall()
+
+
+def montar_esquema(colunas, pk, fk, indices) -> EsquemaBanco:
+    """
+    Monta o modelo de esquema a partir das linhas retornadas pelas consultas de catálogo.
+
+    Args:
+        colunas, pk, fk, indices: Linhas no formato descrito em `_CATALOGO_SQL`.
+
+    Returns:
+        EsquemaBanco: O modelo de esquema preenchido.
+    """
+    esquema = EsquemaBanco()
+    for table_name, column_name, data_type, nullable in colunas:
+        esquema.obter_ou_criar(table_name).adicionar_coluna(Coluna(column_name, data_type, bool(nullable)))
+
+    for table_name, column_name in pk:
+        tabela = esquema.tabela(table_name)
+        coluna = tabela.coluna(column_name) if tabela else None
+        if coluna is not None:
+            coluna.chave_primaria = True
+
+    # Agrupa as colunas de chaves e índices compostos (as linhas chegam ordenadas)
+    chaves = {}
+    for constraint, table_name, column_name, ref_table, ref_column in fk:
+        if (table_name, constraint) not in chaves:
+            chaves[(table_name, constraint)] = ChaveEstrangeira(constraint, [], ref_table, [])
+        chaves[(table_name, constraint)].colunas.append(column_name)
+        chaves[(table_name, constraint)].colunas_referenciadas.append(ref_column)
+    for (table_name, _), chave in chaves.items():
+        esquema.obter_ou_criar(table_name).adicionar_chave_estrangeira(chave)
+
+    idx_por_nome = {}
+    for table_name, index_name, unique, column_name in indices:
+        if (table_name, index_name) not in idx_por_nome:
+            idx_por_nome[(table_name, index_name)] = Indice(index_name, [], bool(unique))
+        idx_por_nome[(table_name, index_name)].colunas.append(column_name)
+    for (table_name, _), indice in idx_por_nome.items():
+        esquema.obter_ou_criar(table_name).adicionar_indice(indice)
+
+    return esquema
+
+
+def carregar_esquema(conn) -> EsquemaBanco | None:
+    """
+    Recupera o esquema do banco de dados como um modelo indexado em memória,
+    incluindo chaves primárias, chaves estrangeiras e índices.
+
+    Args:
+        conn: Objeto de conexão com o banco de dados.
+
+    Returns:
+        EsquemaBanco | None: O modelo de esquema ou None se o tipo de banco não for suportado.
+    """
+    if DB_TYPE not in _CATALOGO_SQL:
+        log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter esquema.")
+        return None
+    cursor = conn.cursor()
+    try:
+        esquema = montar_esquema(
+            _executar_catalogo(cursor, 'colunas'),
+            _executar_catalogo(cursor, 'pk'),
+            _executar_catalogo(cursor, 'fk'),
+            _executar_catalogo(cursor, 'indices'),
+        )
+    finally:
+        cursor.close()
+    log_event(f"Modelo de esquema carregado: {len(esquema)} tabelas.")
+    return esquema
+
+
+def suporta_esquema(db_type: str = DB_TYPE) -> bool:
+    """Indica se há consultas de catálogo para ler o esquema do tipo de banco informado."""
+    return db_type in _CATALOGO_SQL
+
+
+def carregar_esquema_em_cache(conectar, recarregar: bool = False) -> EsquemaBanco | None:
+    """
+    Retorna o modelo de esquema em cache no processo, carregando-o na primeira chamada.
+    Chamadas concorrentes (ex: pré-aquecimento e primeira página) aguardam a mesma carga.
+
+    Depois de SCHEMA_CACHE_TTL_S o catálogo é relido em uma thread, sem bloquear quem chama:
+    o modelo anterior continua sendo retornado até a nova carga terminar. Se a releitura falhar,
+    a próxima tentativa espera SCHEMA_RELOAD_BACKOFF_S, dobrando a cada falha seguida.
+
+    O modelo é compartilhado entre as sessões e não deve ser alterado por elas.
+
+    Args:
+        conectar (callable): Função sem argumentos que retorna uma nova conexão.
+        recarregar (bool): Força a releitura imediata (síncrona) do catálogo.
+
+    Returns:
+        EsquemaBanco | None: O modelo de esquema ou None se não foi possível carregá-lo. Se a
+                             releitura falhar, o modelo anterior continua sendo retornado.
+    """
+    global _esquema_cache_recarga
+    with _esquema_cache_lock:
+        if _esquema_cache is not None and not recarregar:
+            if time.time() >= _esquema_cache_expira_em and _esquema_cache_recarga is None:
+                _esquema_cache_recarga = threading.Thread(target=_recarregar_esquema_em_segundo_plano,
+                                                          args=(conectar,), name="recarga-esquema", daemon=True)
+                _esquema_cache_recarga.start()
+            return _esquema_cache
+        # Primeira carga ou recarga forçada: síncrona e sob o lock
+        primeira_carga = _esquema_cache is None
+        esquema, erro = _ler_esquema(conectar)
+        _registrar_carga(esquema, erro)
+        if erro is not None and primeira_carga and not isinstance(erro, ConnectionError):
+            raise erro
+        return _esquema_cache
+
+
+def _ler_esquema(conectar) -> tuple[EsquemaBanco | None, Exception | None]:
+    """Lê o catálogo em uma nova conexão, sem alterar o cache; retorna o modelo ou o erro."""
+    try:
+        conn = conectar()
+        if not conn:
+            return None, ConnectionError("não foi possível conectar ao banco de dados")
+        try:
+            return carregar_esquema(conn), None
+        finally:
+            conn.close()
+    except Exception as e:
+        return None, e
+
+
+def _registrar_carga(esquema: EsquemaBanco | None, erro: Exception | None):
+    """Atualiza o cache com o resultado de uma carga (chamado com _esquema_cache_lock adquirido)."""
+    global _esquema_cache, _esquema_cache_expira_em, _esquema_cache_falhas
+    if erro is not None:
+        _esquema_cache_falhas += 1
+        espera = min(SCHEMA_RELOAD_BACKOFF_S * 2 ** (_esquema_cache_falhas - 1), SCHEMA_CACHE_TTL_S)
+        _esquema_cache_expira_em = time.time() + espera
+        log_event(f"Erro ao recarregar o esquema do banco de dados: {erro}; nova tentativa em {espera:.0f}s.")
+    elif esquema is not None:
+        _esquema_cache = esquema
+        _esquema_cache_falhas = 0
+        _esquema_cache_expira_em = time.time() + SCHEMA_CACHE_TTL_S
+
+
+def _recarregar_esquema_em_segundo_plano(conectar):
+    global _esquema_cache_recarga
+    # A leitura do catálogo (que pode demorar se o banco não responder) fica fora do lock;
+    # enquanto isso as sessões continuam recebendo o modelo anterior
+    esquema, erro = _ler_esquema(conectar)
+    with _esquema_cache_lock:
+        _registrar_carga(esquema, erro)
+        _esquema_cache_recarga = None
+
+
 def get_table_schema(conn) -> str:
     """
     Recupera o esquema das tabelas do banco de dados.
@@ -81,58 +384,20 @@ def get_table_schema(conn) -> str:
     Returns:
         str: Uma string formatada com o esquema das tabelas (nome da tabela, colunas e tipos).
     """
-    schema_info = []
     try:
-        cursor = conn.cursor()
-        if DB_TYPE == 'postgresql':
-            cursor.execute("""
-                SELECT table_name, column_name, data_type
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                ORDER BY table_name, ordinal_position;
-            """)
-        elif DB_TYPE == 'sqlserver':
-            cursor.execute("""
-                SELECT
-                    t.name AS table_name,
-                    c.name AS column_name,
-                    ty.name AS data_type
-                FROM sys.tables t
-                INNER JOIN sys.columns c ON t.object_id = c.object_id
-                INNER JOIN sys.types ty ON c.system_type_id = ty.system_type_id
-                ORDER BY t.name, c.column_id;
-            """)
-        elif DB_TYPE == 'mysql':
-            cursor.execute(f"""
-                SELECT table_name, column_name, data_type
-                FROM information_schema.columns
-                WHERE table_schema = '{DB_NAME}'
-                ORDER BY table_name, ordinal_position;
-            """)
-        else:
-            log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter esquema.")
+        esquema = carregar_esquema(conn)
+        if esquema is None:
             return "Informações do esquema não disponíveis para este tipo de banco de dados."
-
-        rows = cursor.fetchall()
-        current_table = None
-        for row in rows:
-            table_name, column_name, data_type = row
-            if table_name != current_table:
-                if current_table is not None:
-                    schema_info.append("") # Linha em branco entre tabelas
-                schema_info.append(f"Tabela: {table_name}")
-                current_table = table_name
-            schema_info.append(f"  - {column_name} ({data_type})")
-        cursor.close()
         log_event("Esquema do banco de dados recuperado com sucesso.")
-        return "\n".join(schema_info)
+        return esquema.renderizar_prompt()
     except Exception as e:
         log_event(f"Erro ao obter esquema do banco de dados: {e}")
         return f"Erro ao obter esquema do banco de dados: {e}"
 
 def get_table_size_and_row_count(conn) -> dict:
     """
-    Recupera o tamanho aproximado e a contagem de linhas de todas as tabelas.
+    Recupera o tamanho aproximado e a contagem de linhas de todas as tabelas, com as mesmas
+    consultas e estimativas do coletor de estatísticas (table_stats).
 
     Args:
         conn: Objeto de conexão com o banco de dados.
@@ -141,58 +406,22 @@ def get_table_size_and_row_count(conn) -> dict:
         dict: Um dicionário onde as chaves são nomes de tabelas e os valores são dicionários
               com 'size_bytes' e 'row_count'.
     """
-    table_stats = {}
+    if not suporta_estatisticas():
+        log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter tamanho/linhas.")
+        return {}
     try:
         cursor = conn.cursor()
-        if DB_TYPE == 'postgresql':
-            cursor.execute("""
-                SELECT
-                    relname AS table_name,
-                    pg_total_relation_size(oid) AS total_size_bytes,
-                    reltuples AS row_count
-                FROM pg_class
-                WHERE relkind = 'r' AND relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
-                ORDER BY relname;
-            """)
-        elif DB_TYPE == 'sqlserver':
-            cursor.execute("""
-                SELECT
-                    t.name AS table_name,
-                    SUM(a.total_pages) * 8 * 1024 AS total_size_bytes, -- 8KB por página
-                    SUM(p.rows) AS row_count
-                FROM sys.tables t
-                INNER JOIN sys.indexes i ON t.object_id = i.object_id
-                INNER JOIN sys.partitions p ON i.object_id = p.object_id AND i.index_id = p.index_id
-                INNER JOIN sys.allocation_units a ON p.partition_id = a.container_id
-                GROUP BY t.name
-                ORDER BY t.name;
-            """)
-        elif DB_TYPE == 'mysql':
-            cursor.execute(f"""
-                SELECT
-                    table_name,
-                    data_length + index_length AS total_size_bytes,
-                    table_rows AS row_count
-                FROM information_schema.tables
-                WHERE table_schema = '{DB_NAME}'
-                ORDER BY table_name;
-            """)
+        sql, params = montar_consulta_estatisticas()
+        if params:
+            cursor.execute(sql, params)
         else:
-            log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter tamanho/linhas.")
-            return {}
-
-        rows = cursor.fetchall()
-        for row in rows:
-            table_name = row[0]
-            size_bytes = row[1] if row[1] is not None else 0
-            row_count = row[2] if row[2] is not None else 0
-            table_stats[table_name] = {
-                'size_bytes': size_bytes,
-                'row_count': row_count
-            }
+            cursor.execute(sql)
+        table_stats = montar_estatisticas(cursor.fetchall())
         cursor.close()
         log_event("Tamanhos e contagens de linhas das tabelas recuperados com sucesso.")
         return table_stats
     except Exception as e:
+        if usar_catalogo_sem_dmv(e):
+            return get_table_size_and_row_count(conn)
         log_event(f"Erro ao obter tamanho e contagem de linhas das tabelas: {e}")
-        return {}
\ No newline at end of file
+        return {}
@@ -0,0 +1,200 @@
+import asyncio
+import re
+
+from backends import importar
+from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_TYPE
+from db import _CATALOGO_SQL, conectar_banco, montar_esquema
+from schema_model import EsquemaBanco
+from table_stats import montar_consulta_estatisticas, montar_estatisticas, suporta_estatisticas, usar_catalogo_sem_dmv
+from utils import log_event
+
+# Drivers assíncronos por dialeto, em ordem de preferência. Dialetos sem driver assíncrono
+# disponível (ex: SQL Server via pyodbc) usam a conexão síncrona em uma thread (asyncio.to_thread).
+ASYNC_DB_DRIVERS = {
+    'postgresql': ('asyncpg', 'psycopg'),
+    'mysql': ('aiomysql',),
+}
+
+_PLACEHOLDER_RE = re.compile(r"%s")
+
+
+def _para_asyncpg(sql: str) -> str:
+    """Converte os marcadores '%s' do DB-API para os '$1, $2, ...' do asyncpg."""
+    contador = iter(range(1, 1000))
+    return _PLACEHOLDER_RE.sub(lambda _: f"${next(contador)}", sql)
+
+
+class ConexaoAsync:
+    """
+    Conexão assíncrona com uma interface única (`consultar`/`close`) sobre o driver escolhido.
+
+    Attributes:
+        driver (str): 'asyncpg', 'psycopg', 'aiomysql' ou 'thread' (DB-API síncrono em thread).
+    """
+    __slots__ = ("driver", "_conn")
+
+    def __init__(self, driver: str, conn):
+        self.driver = driver
+        self._conn = conn
+
+    async def consultar(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Executa uma consulta e retorna todas as linhas como tuplas."""
+        if self.driver == 'asyncpg':
+            return [tuple(r) for r in await self._conn.fetch(_para_asyncpg(sql), *params)]
+        if self.driver in ('psycopg', 'aiomysql'):
+            async with self._conn.cursor() as cursor:
+                await cursor.execute(sql, params or None)
+                return list(await cursor.fetchall())
+        return await asyncio.to_thread(self._consultar_sync, sql, params)
+
+    def _consultar_sync(self, sql: str, params: tuple) -> list[tuple]:
+        cursor = self._conn.cursor()
+        try:
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    async def close(self):
+        if self.driver in ('asyncpg', 'psycopg'):
+            await self._conn.close()
+        elif self.driver == 'aiomysql':
+            self._conn.close()
+        else:
+            await asyncio.to_thread(self._conn.close)
+
+
+async def _conectar_driver(driver: str):
+    if driver == 'asyncpg':
+        return await importar('asyncpg').connect(
+            host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
+    if driver == 'psycopg':
+        return await importar('psycopg').AsyncConnection.connect(
+            host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, dbname=DB_NAME, autocommit=True)
+    if driver == 'aiomysql':
+        return await importar('aiomysql').connect(
+            host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, db=DB_NAME)
+    raise ValueError(f"Driver assíncrono desconhecido: {driver}")
+
+
+async def conectar_banco_async() -> ConexaoAsync | None:
+    """
+    Versão assíncrona de `db.conectar_banco`. Usa o primeiro driver assíncrono instalado para o
+    dialeto configurado e, na falta dele, a conexão síncrona executada em uma thread.
+
+    Returns:
+        ConexaoAsync | None: A conexão ou None se não foi possível conectar.
+    """
+    for driver in ASYNC_DB_DRIVERS.get(DB_TYPE, ()):
+        try:
+            conn = await _conectar_driver(driver)
+        except ImportError:
+            continue
+        except Exception as e:
+            log_event(f"Erro ao conectar ao banco de dados {DB_TYPE} via {driver}: {e}")
+            return None
+        log_event(f"Conexão assíncrona {DB_TYPE} estabelecida com {DB_NAME} via {driver}.")
+        return ConexaoAsync(driver, conn)
+
+    conn = await asyncio.to_thread(conectar_banco)
+    if conn is None:
+        return None
+    return ConexaoAsync('thread', conn)
+
+
+def _params_catalogo() -> tuple:
+    return (DB_NAME,) if DB_TYPE == 'mysql' else ()
+
+
+async def carregar_esquema_async(conn: ConexaoAsync) -> EsquemaBanco | None:
+    """
+    Versão assíncrona de `db.carregar_esquema`.
+
+    Args:
+        conn (ConexaoAsync): Conexão obtida com `conectar_banco_async`.
+
+    Returns:
+        EsquemaBanco | None: O modelo de esquema ou None se o tipo de banco não for suportado.
+    """
+    if DB_TYPE not in _CATALOGO_SQL:
+        log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter esquema.")
+        return None
+    # Uma conexão não executa consultas simultâneas; as quatro consultas rodam em sequência
+    consultas = _CATALOGO_SQL[DB_TYPE]
+    linhas = [await conn.consultar(consultas[nome], _params_catalogo())
+              for nome in ('colunas', 'pk', 'fk', 'indices')]
+    esquema = montar_esquema(*linhas)
+    log_event(f"Modelo de esquema carregado (async): {len(esquema)} tabelas.")
+    return esquema
+
+
+async def get_table_schema_async(conn: ConexaoAsync) -> str:
+    """
+    Versão assíncrona de `db.get_table_schema`.
+
+    Returns:
+        str: Uma string formatada com o esquema das tabelas (nome da tabela, colunas e tipos).
+    """
+    try:
+        esquema = await carregar_esquema_async(conn)
+        if esquema is None:
+            return "Informações do esquema não disponíveis para este tipo de banco de dados."
+        log_event("Esquema do banco de dados recuperado com sucesso (async).")
+        return esquema.renderizar_prompt()
+    except Exception as e:
+        log_event(f"Erro ao obter esquema do banco de dados: {e}")
+        return f"Erro ao obter esquema do banco de dados: {e}"
+
+
+async def get_table_size_and_row_count_async(conn: ConexaoAsync) -> dict:
+    """
+    Versão assíncrona de `db.get_table_size_and_row_count` (mesmas consultas e estimativas do table_stats).
+
+    Returns:
+        dict: Nomes de tabelas -> {'size_bytes', 'row_count'}.
+    """
+    if not suporta_estatisticas():
+        log_event(f"Tipo de banco de dados {DB_TYPE} não suportado para obter tamanho/linhas.")
+        return {}
+    try:
+        table_stats = montar_estatisticas(await conn.consultar(*montar_consulta_estatisticas()))
+        log_event("Tamanhos e contagens de linhas das tabelas recuperados com sucesso (async).")
+        return table_stats
+    except Exception as e:
+        if usar_catalogo_sem_dmv(e):
+            return await get_table_size_and_row_count_async(conn)
+        log_event(f"Erro ao obter tamanho e contagem de linhas das tabelas: {e}")
+        return {}
+
+
+async def _com_conexao(funcao):
+    conn = await conectar_banco_async()
+    if conn is None:
+        return None
+    try:
+        return await funcao(conn)
+    finally:
+        await conn.close()
+
+
+async def carregar_info_banco_async() -> tuple[EsquemaBanco | None, dict]:
+    """
+    Carrega o esquema e os tamanhos das tabelas em paralelo, cada um em sua própria conexão,
+    em vez de um após o outro.
+
+    Returns:
+        tuple[EsquemaBanco | None, dict]: O modelo de esquema e as estatísticas das tabelas.
+    """
+    esquema, tamanhos = await asyncio.gather(
+        _com_conexao(carregar_esquema_async),
+        _com_conexao(get_table_size_and_row_count_async),
+    )
+    return esquema, tamanhos or {}
+
+
+def carregar_info_banco() -> tuple[EsquemaBanco | None, dict]:
+    """Ponto de entrada síncrono para `carregar_info_banco_async` (ex: a partir do Streamlit)."""
+    return asyncio.run(carregar_info_banco_async())
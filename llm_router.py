@@ -0,0 +1,392 @@
+import re
+import threading
+import time
+from collections import deque
+
+import config
+from config import LLM_API_URL, LLM_MODEL
+from models.lm_studio_model import LmStudioModel
+from models.ollama_model import OllamaModel
+from schema_model import EsquemaBanco
+from utils import get_approx_token_count, log_event
+
+# Perfis de backend: 'rapido' (modelo pequeno, consultas simples) e 'completo' (modelo maior, joins/agregações)
+PERFIS = ('rapido', 'completo')
+# Falhas consecutivas até um backend ser considerado indisponível
+MAX_FALHAS_CONSECUTIVAS = 2
+# Intervalo da verificação periódica de saúde e tempo que um backend com falhas fica fora da rota (segundos)
+INTERVALO_VERIFICACAO_SAUDE_S = 30
+# Tempo máximo de espera por um backend livre quando todos os candidatos estão saturados (segundos)
+MAX_ESPERA_BACKEND_S = 60
+# Quantidade de decisões de roteamento mantidas para as métricas
+MAX_DECISOES_REGISTRADAS = 200
+
+ADAPTADORES = {
+    'ollama': OllamaModel,
+    'lmstudio': LmStudioModel,
+}
+
+# Indícios, no pedido em linguagem natural, de consultas com joins ou agregações
+_INDICIOS_COMPLEXIDADE = re.compile(
+    r"\b(join|junt\w*|relacion\w*|cruz\w*|combin\w*|agrup\w*|group|para cada|cada um|em cada|"
+    r"soma\w*|sum|m[eé]di[ao]\w*|avg|total de|total geral|totais|quant[oa]s|quantidade de|contagem|count|"
+    r"m[aá]xim[oa]|m[ií]nim[oa]|ranking|compar\w*|subconsulta|hist[oó]rico|evolu[cç][aã]o|"
+    r"di[aá]ri[oa]s?|semana(l|is)|mensa(l|is)|trimestra(l|is)|anua(l|is))\b",
+    re.IGNORECASE,
+)
+# "por <período/coluna>" indica GROUP BY ("vendas por mês", "pedidos por cliente"), exceto quando
+# "por" introduz uma ordenação/filtro ("ordenado por data") ou faz parte de uma expressão ("por favor")
+_AGRUPAMENTO_POR = re.compile(r"\b(?:por|by|per)\s+(\w+)", re.IGNORECASE)
+_ANTES_DE_POR_SEM_AGRUPAMENTO = ("orden", "classific", "filtr", "busc", "pesquis", "procur", "order", "sort", "filter")
+_DEPOIS_DE_POR_SEM_AGRUPAMENTO = {"favor", "gentileza", "exemplo", "que", "isso", "enquanto", "fim", "acaso", "vez"}
+
+
+def _tem_agrupamento_por(prompt: str) -> bool:
+    for m in _AGRUPAMENTO_POR.finditer(prompt):
+        if m.group(1).lower() in _DEPOIS_DE_POR_SEM_AGRUPAMENTO:
+            continue
+        # O verbo de ordenação/filtro costuma vir até três palavras antes ("filtrar pedidos por status")
+        anteriores = prompt[:m.start()].lower().split()[-3:]
+        if any(p.startswith(_ANTES_DE_POR_SEM_AGRUPAMENTO) for p in anteriores):
+            continue
+        return True
+    return False
+
+
+def classificar_prompt(prompt: str, esquema: EsquemaBanco | None = None) -> str:
+    """
+    Classifica o pedido do usuário como 'simples' ou 'complexa'.
+
+    É 'complexa' quando o texto contém indícios de join/agregação (incluindo "por <período/coluna>")
+    ou cita duas ou mais tabelas do esquema (por nome ou sinônimo, via `EsquemaBanco.encontrar_tabelas`);
+    caso contrário é 'simples' (ex: um SELECT em uma única tabela).
+
+    Exemplos:
+        "total de vendas por mês" -> 'complexa'
+        "quantos pedidos cada cliente fez" -> 'complexa'
+        "ticket médio por cidade em 2024" -> 'complexa'
+        "clientes e seus pedidos" (com o esquema) -> 'complexa'
+        "clientes de Curitiba ordenados por nome" -> 'simples'
+        "pedidos com total acima de 100" -> 'simples'
+        "filtrar pedidos por status pago" -> 'simples'
+    """
+    if _INDICIOS_COMPLEXIDADE.search(prompt) or _tem_agrupamento_por(prompt):
+        return 'complexa'
+    if esquema is not None and len(esquema.encontrar_tabelas(prompt)) >= 2:
+        return 'complexa'
+    return 'simples'
+
+
+class BackendLLM:
+    """Um endpoint/modelo registrado no roteador, com seu estado de carga e saúde."""
+    __slots__ = ("nome", "modelo", "perfil", "max_concorrencia", "max_prompt_tokens",
+                 "em_uso", "falhas_consecutivas", "indisponivel_ate", "latencia_media_s",
+                 "requisicoes", "falhas")
+
+    def __init__(self, nome: str, modelo, perfil: str = 'completo', max_concorrencia: int = 1,
+                 max_prompt_tokens: int = 8192):
+        if perfil not in PERFIS:
+            raise ValueError(f"Perfil de backend inválido: {perfil}")
+        self.nome = nome
+        self.modelo = modelo
+        self.perfil = perfil
+        self.max_concorrencia = max_concorrencia
+        self.max_prompt_tokens = max_prompt_tokens
+        self.em_uso = 0
+        self.falhas_consecutivas = 0
+        self.indisponivel_ate = 0.0
+        self.latencia_media_s = None
+        self.requisicoes = 0
+        self.falhas = 0
+
+    @property
+    def saturado(self) -> bool:
+        return self.em_uso >= self.max_concorrencia
+
+    @property
+    def carga(self) -> float:
+        return self.em_uso / self.max_concorrencia
+
+    def disponivel(self, agora: float) -> bool:
+        return self.indisponivel_ate <= agora
+
+
+class RoteadorLLM:
+    """
+    Distribui as gerações entre vários backends LLM locais (Ollama / LM Studio).
+
+    A escolha considera, nesta ordem: saúde do backend, se o prompt cabe no seu limite de tokens,
+    o perfil adequado à complexidade do pedido, a carga atual e a latência média. O backend é
+    escolhido e reservado atomicamente; se o preferido estiver saturado, o próximo candidato livre
+    é usado e, se todos estiverem saturados, o pedido aguarda um ficar livre. Se o backend falhar,
+    o próximo candidato é tentado. A saúde é verificada periodicamente em segundo plano
+    (`iniciar_verificacao_saude`). Cada decisão é registrada nas métricas (`metricas()`).
+    """
+
+    def __init__(self):
+        self._backends = {}
+        self._lock = threading.Lock()
+        # Sinaliza a liberação de um backend aos pedidos que aguardam
+        self._liberado = threading.Condition(self._lock)
+        self._decisoes = deque(maxlen=MAX_DECISOES_REGISTRADAS)
+        self._fallbacks = 0
+        self._verificacao_saude = None
+        self._parar = threading.Event()
+
+    def registrar(self, nome: str, modelo, perfil: str = 'completo', max_concorrencia: int = 1,
+                  max_prompt_tokens: int = 8192) -> BackendLLM:
+        """
+        Registra um backend.
+
+        Args:
+            nome (str): Identificador único do backend.
+            modelo: Adaptador com `gerar(prompt, max_tokens, contexto)` (ex: OllamaModel, LmStudioModel).
+            perfil (str): 'rapido' para consultas simples ou 'completo' para joins/agregações.
+            max_concorrencia (int): Gerações simultâneas antes de o backend ser considerado saturado.
+            max_prompt_tokens (int): Maior prompt (tokens aproximados) aceito pelo backend.
+        """
+        backend = BackendLLM(nome, modelo, perfil, max_concorrencia, max_prompt_tokens)
+        with self._lock:
+            self._backends[nome] = backend
+        log_event(f"Backend LLM registrado: {nome} ({modelo.tipo}, modelo '{modelo.model_path}', perfil {perfil}).")
+        return backend
+
+    def backend(self, nome: str) -> BackendLLM | None:
+        return self._backends.get(nome)
+
+    def _ordenar_candidatos(self, complexidade: str, tokens: int) -> list[BackendLLM]:
+        agora = time.time()
+        perfil_preferido = 'rapido' if complexidade == 'simples' else 'completo'
+        candidatos = [b for b in self._backends.values()
+                      if b.disponivel(agora) and tokens <= b.max_prompt_tokens]
+        if not candidatos:
+            # Nenhum backend saudável comporta o prompt: tenta os que comportam, mesmo indisponíveis
+            candidatos = [b for b in self._backends.values() if tokens <= b.max_prompt_tokens]
+
+        def chave(b: BackendLLM):
+            return (b.perfil != perfil_preferido, b.carga,
+                    b.latencia_media_s if b.latencia_media_s is not None else 0.0)
+
+        return sorted(candidatos, key=chave)
+
+    def _reservar(self, complexidade: str, tokens: int, fixo: str | None,
+                  tentados: set[str]) -> tuple[BackendLLM | None, bool]:
+        """
+        Escolhe e reserva (em_uso += 1), sob o mesmo lock, o melhor candidato livre ainda não tentado.
+        Se todos os candidatos estiverem saturados, aguarda até MAX_ESPERA_BACKEND_S por uma liberação.
+
+        Returns:
+            tuple[BackendLLM | None, bool]: O backend reservado (None se não restam candidatos) e se
+                                            ele não era o preferido (fallback).
+
+        Raises:
+            TimeoutError: Se nenhum candidato ficar livre dentro do tempo de espera.
+        """
+        limite = time.monotonic() + MAX_ESPERA_BACKEND_S
+        with self._liberado:
+            while True:
+                if fixo is not None:
+                    candidatos = [self._backends[fixo]] if fixo in self._backends else []
+                else:
+                    candidatos = self._ordenar_candidatos(complexidade, tokens)
+                candidatos = [b for b in candidatos if b.nome not in tentados]
+                if not candidatos:
+                    return None, False
+                for posicao, backend in enumerate(candidatos):
+                    if not backend.saturado:
+                        backend.em_uso += 1
+                        backend.requisicoes += 1
+                        fallback = bool(tentados) or posicao > 0
+                        if fallback:
+                            self._fallbacks += 1
+                        return backend, fallback
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise TimeoutError(f"Todos os backends LLM candidatos continuam saturados após "
+                                       f"{MAX_ESPERA_BACKEND_S}s de espera.")
+                self._liberado.wait(restante)
+
+    def _liberar(self, backend: BackendLLM):
+        with self._liberado:
+            backend.em_uso -= 1
+            self._liberado.notify_all()
+
+    def gerar(self, texto: str, complexidade: str = 'simples', max_tokens: int | None = None,
+              contexto: list[int] | None = None, fixo: str | None = None) -> tuple[str, list[int] | None, str]:
+        """
+        Gera texto no backend mais adequado, com fallback para os demais candidatos.
+
+        Args:
+            texto (str): O prompt enviado ao modelo.
+            complexidade (str): 'simples' ou 'complexa' (ver `classificar_prompt`).
+            max_tokens (int | None): Limite de tokens da resposta.
+            contexto (list[int] | None): Tokens de contexto do Ollama; exige `fixo`.
+            fixo (str | None): Usa apenas este backend (o contexto só vale no modelo que o gerou).
+
+        Returns:
+            tuple[str, list[int] | None, str]: Texto gerado, novo contexto e nome do backend usado.
+
+        Raises:
+            RuntimeError: Se não houver backend capaz de atender o prompt.
+            TimeoutError: Se todos os candidatos continuarem saturados após MAX_ESPERA_BACKEND_S.
+            Exception: A última exceção dos backends, se todos falharem.
+        """
+        tokens = get_approx_token_count(texto)
+        motivo = "contexto" if fixo is not None else complexidade
+        tentados = set()
+        ultima_excecao = None
+        while True:
+            backend, fallback = self._reservar(complexidade, tokens, fixo, tentados)
+            if backend is None:
+                break
+            tentados.add(backend.nome)
+            inicio = time.perf_counter()
+            try:
+                resposta, novo_contexto = backend.modelo.gerar(texto, max_tokens, contexto if fixo else None)
+            except Exception as e:
+                ultima_excecao = e
+                self._registrar_falha(backend, e)
+                continue
+            finally:
+                self._liberar(backend)
+            duracao = time.perf_counter() - inicio
+            self._registrar_sucesso(backend, duracao, motivo, complexidade, tokens, fallback)
+            return resposta, novo_contexto, backend.nome
+        if ultima_excecao is None:
+            raise RuntimeError(f"Nenhum backend LLM comporta um prompt de ~{tokens} tokens.")
+        raise ultima_excecao
+
+    def _registrar_sucesso(self, backend: BackendLLM, duracao: float, motivo: str, complexidade: str,
+                           tokens: int, fallback: bool):
+        with self._lock:
+            backend.falhas_consecutivas = 0
+            backend.indisponivel_ate = 0.0
+            # Média móvel exponencial da latência
+            backend.latencia_media_s = duracao if backend.latencia_media_s is None \
+                else 0.8 * backend.latencia_media_s + 0.2 * duracao
+            self._decisoes.append({
+                "timestamp": time.time(),
+                "backend": backend.nome,
+                "perfil": backend.perfil,
+                "motivo": motivo,
+                "complexidade": complexidade,
+                "prompt_tokens": tokens,
+                "fallback": fallback,
+                "latencia_s": round(duracao, 4),
+            })
+        log_event(f"Roteamento LLM: '{backend.nome}' atendeu pedido {complexidade} (~{tokens} tokens) "
+                  f"em {duracao:.2f}s{' após fallback' if fallback else ''}.")
+
+    def _registrar_falha(self, backend: BackendLLM, erro: Exception):
+        with self._lock:
+            backend.falhas += 1
+            backend.falhas_consecutivas += 1
+            if backend.falhas_consecutivas >= MAX_FALHAS_CONSECUTIVAS:
+                backend.indisponivel_ate = time.time() + INTERVALO_VERIFICACAO_SAUDE_S
+        log_event(f"Falha no backend LLM '{backend.nome}': {erro}")
+
+    def verificar_saude(self):
+        """Consulta a saúde de todos os backends e atualiza sua disponibilidade."""
+        for backend in list(self._backends.values()):
+            saudavel = backend.modelo.verificar_saude()
+            with self._lock:
+                if saudavel:
+                    if not backend.disponivel(time.time()):
+                        log_event(f"Backend LLM '{backend.nome}' voltou a responder.")
+                    backend.falhas_consecutivas = 0
+                    backend.indisponivel_ate = 0.0
+                else:
+                    if backend.disponivel(time.time()):
+                        log_event(f"Backend LLM '{backend.nome}' não respondeu à verificação de saúde.")
+                    # Fica fora da rota até a próxima verificação
+                    backend.indisponivel_ate = time.time() + 2 * INTERVALO_VERIFICACAO_SAUDE_S
+
+    def iniciar_verificacao_saude(self, intervalo_s: float = INTERVALO_VERIFICACAO_SAUDE_S):
+        """Inicia a verificação periódica de saúde dos backends em segundo plano, se ainda não iniciada."""
+        with self._lock:
+            if self._verificacao_saude is not None and self._verificacao_saude.is_alive():
+                return
+            self._parar.clear()
+
+            def _executar():
+                while not self._parar.is_set():
+                    try:
+                        self.verificar_saude()
+                    except Exception as e:
+                        log_event(f"Erro na verificação de saúde dos backends LLM: {e}")
+                    self._parar.wait(intervalo_s)
+
+            self._verificacao_saude = threading.Thread(target=_executar, name="saude-llm", daemon=True)
+            self._verificacao_saude.start()
+
+    def parar_verificacao_saude(self):
+        """Sinaliza a thread de verificação de saúde para encerrar."""
+        self._parar.set()
+
+    def metricas(self) -> dict:
+        """Retorna o estado de cada backend, o total de fallbacks e as decisões recentes."""
+        agora = time.time()
+        with self._lock:
+            return {
+                "backends": {
+                    b.nome: {
+                        "tipo": b.modelo.tipo,
+                        "modelo": b.modelo.model_path,
+                        "perfil": b.perfil,
+                        "em_uso": b.em_uso,
+                        "max_concorrencia": b.max_concorrencia,
+                        "disponivel": b.disponivel(agora),
+                        "requisicoes": b.requisicoes,
+                        "falhas": b.falhas,
+                        "latencia_media_s": round(b.latencia_media_s, 4) if b.latencia_media_s is not None else None,
+                    }
+                    for b in self._backends.values()
+                },
+                "fallbacks": self._fallbacks,
+                "decisoes": list(self._decisoes),
+            }
+
+
+def _url_base(url: str) -> str:
+    return url.replace("/api/generate", "").replace("/v1/completions", "").rstrip("/")
+
+
+def criar_roteador_da_config() -> RoteadorLLM:
+    """
+    Cria o roteador a partir de `LLM_BACKENDS` em config.py. Cada item é um dict com:
+    'nome', 'tipo' ('ollama' ou 'lmstudio'), 'url', 'modelo' e, opcionalmente, 'perfil',
+    'max_concorrencia' e 'max_prompt_tokens'.
+
+    Sem `LLM_BACKENDS`, registra um único backend a partir de LLM_API_URL/LLM_MODEL.
+    """
+    roteador = RoteadorLLM()
+    backends = getattr(config, "LLM_BACKENDS", None)
+    if not backends:
+        tipo = 'lmstudio' if "v1/completions" in LLM_API_URL.lower() else 'ollama'
+        backends = [{"nome": "padrao", "tipo": tipo, "url": LLM_API_URL, "modelo": LLM_MODEL}]
+    for item in backends:
+        adaptador = ADAPTADORES[item["tipo"]](item["modelo"], base_url=_url_base(item["url"]))
+        roteador.registrar(
+            item["nome"], adaptador,
+            perfil=item.get("perfil", 'completo'),
+            max_concorrencia=item.get("max_concorrencia", 1),
+            max_prompt_tokens=item.get("max_prompt_tokens", 8192),
+        )
+    return roteador
+
+
+_roteador = None
+_roteador_lock = threading.Lock()
+
+
+def obter_roteador() -> RoteadorLLM:
+    """
+    Retorna o roteador compartilhado pelo processo, criando-o e iniciando a verificação
+    periódica de saúde na primeira chamada.
+    """
+    global _roteador
+    with _roteador_lock:
+        if _roteador is None:
+            _roteador = criar_roteador_da_config()
+            _roteador.iniciar_verificacao_saude()
+        return _roteador
@@ -1,10 +1,51 @@
 """ **lm_studio_model.py:** """
-import lm_studio
+import requests
 
 
 class LmStudioModel:
-    def __init__(self, model_path):
-        self.model = lm_studio.load_model(model_path)
+    """
+    Adaptador para um modelo servido pelo LM Studio (API compatível com OpenAI /v1/completions).
+
+    Args:
+        model_path (str): Identificador do modelo carregado no LM Studio.
+        base_url (str): Endereço do servidor (ex: 'http://localhost:1234').
+        timeout (float): Tempo máximo de espera por uma geração (segundos).
+    """
+    tipo = "lmstudio"
+
+    def __init__(self, model_path, base_url="http://localhost:1234", timeout=120):
+        self.model_path = model_path
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def gerar(self, prompt, max_tokens=None, contexto=None):
+        """
+        Gera texto a partir do prompt. O LM Studio não devolve tokens de contexto;
+        `contexto` é ignorado e o retorno correspondente é sempre None.
+
+        Returns:
+            tuple[str, None]: O texto gerado e None.
+        """
+        payload = {
+            "model": self.model_path, # Pode ser ignorado pelo LM Studio se o modelo já estiver carregado
+            "prompt": prompt,
+        }
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        response = requests.post(f"{self.base_url}/v1/completions", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        texto = ""
+        if result and "choices" in result and len(result["choices"]) > 0:
+            texto = result["choices"][0].get("text", "").strip()
+        return texto, None
 
     def gerar_sql(self, prompt):
-        return self.model.generate(prompt)
+        return self.gerar(prompt)[0]
+
+    def verificar_saude(self, timeout=2):
+        """Retorna True se o servidor responde à listagem de modelos."""
+        try:
+            return requests.get(f"{self.base_url}/v1/models", timeout=timeout).ok
+        except requests.exceptions.RequestException:
+            return False
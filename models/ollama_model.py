@@ -1,11 +1,56 @@
 """ **ollama_model.py** """
 
-import ollama
+import requests
 
 
 class OllamaModel:
-    def __init__(self, model_path):
-        self.model = ollama.load_model(model_path)
+    """
+    Adaptador para um modelo servido pelo Ollama (API /api/generate).
+
+    Args:
+        model_path (str): Nome do modelo no Ollama (ex: 'llama3').
+        base_url (str): Endereço do servidor (ex: 'http://localhost:11434').
+        timeout (float): Tempo máximo de espera por uma geração (segundos).
+    """
+    tipo = "ollama"
+
+    def __init__(self, model_path, base_url="http://localhost:11434", timeout=120):
+        self.model_path = model_path
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def gerar(self, prompt, max_tokens=None, contexto=None):
+        """
+        Gera texto a partir do prompt.
+
+        Args:
+            prompt (str): Texto enviado ao modelo.
+            max_tokens (int | None): Limite de tokens da resposta ('num_predict').
+            contexto (list[int] | None): Tokens de `context` de uma resposta anterior deste modelo.
+
+        Returns:
+            tuple[str, list[int] | None]: O texto gerado e o novo `context` para continuar a conversa.
+        """
+        payload = {
+            "model": self.model_path,
+            "prompt": prompt,
+            "stream": False,
+        }
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+        if contexto:
+            payload["context"] = contexto
+        response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        return result.get("response", "").strip(), result.get("context") or None
 
     def gerar_sql(self, prompt):
-        return self.model.generate(prompt)
+        return self.gerar(prompt)[0]
+
+    def verificar_saude(self, timeout=2):
+        """Retorna True se o servidor responde à listagem de modelos."""
+        try:
+            return requests.get(f"{self.base_url}/api/tags", timeout=timeout).ok
+        except requests.exceptions.RequestException:
+            return False
@@ -0,0 +1,218 @@
+import re
+
+# Prefixos comuns em nomes de tabelas que não fazem parte do nome "natural"
+_PREFIXOS_TABELA = ("tb_", "tbl_", "t_")
+_PALAVRA_RE = re.compile(r"[a-z0-9_]+")
+
+
+def _normalizar(nome: str) -> str:
+    return nome.strip().strip('"[]`').lower()
+
+
+def _singular(palavra: str) -> str:
+    """Singularização simples (português/inglês) usada apenas para sinônimos de nomes."""
+    if len(palavra) <= 3:
+        return palavra
+    for sufixo, troca in (("oes", "ao"), ("aes", "ao"), ("ies", "y"), ("res", "r"), ("s", "")):
+        if palavra.endswith(sufixo):
+            return palavra[: -len(sufixo)] + troca
+    return palavra
+
+
+def gerar_sinonimos(nome: str) -> set[str]:
+    """
+    Gera variações de um nome de tabela/coluna para busca (sem prefixo, singular, sem '_').
+
+    Args:
+        nome (str): Nome original do objeto.
+
+    Returns:
+        set[str]: Conjunto de sinônimos normalizados, incluindo o próprio nome.
+    """
+    base = _normalizar(nome)
+    sinonimos = {base}
+    for prefixo in _PREFIXOS_TABELA:
+        if base.startswith(prefixo) and len(base) > len(prefixo):
+            sinonimos.add(base[len(prefixo):])
+    for s in list(sinonimos):
+        sinonimos.add(_singular(s))
+        sinonimos.add(s.replace("_", ""))
+    return sinonimos
+
+
+def formatar_tamanho(nome: str, size_bytes: int, row_count: int, projected_size_bytes: int | None = None) -> str:
+    """
+    Formata a linha de volume de dados de uma tabela para o prompt do LLM. O tamanho informado é o
+    projetado pela tendência de crescimento, quando conhecido, pois é ele que aciona o guarda de tabela grande.
+    """
+    tamanho = projected_size_bytes if projected_size_bytes is not None else size_bytes
+    return f"Tabela: {nome}, Tamanho: {tamanho / (1024**3):.2f} GB, Linhas: {row_count}"
+
+
+class Coluna:
+    __slots__ = ("nome", "tipo", "anulavel", "chave_primaria")
+
+    def __init__(self, nome: str, tipo: str, anulavel: bool = True, chave_primaria: bool = False):
+        self.nome = nome
+        self.tipo = tipo
+        self.anulavel = anulavel
+        self.chave_primaria = chave_primaria
+
+    def __repr__(self):
+        return f"Coluna({self.nome!r}, {self.tipo!r})"
+
+
+class ChaveEstrangeira:
+    __slots__ = ("nome", "colunas", "tabela_referenciada", "colunas_referenciadas")
+
+    def __init__(self, nome: str, colunas: list[str], tabela_referenciada: str, colunas_referenciadas: list[str]):
+        self.nome = nome
+        self.colunas = colunas
+        self.tabela_referenciada = tabela_referenciada
+        self.colunas_referenciadas = colunas_referenciadas
+
+    def __repr__(self):
+        return f"ChaveEstrangeira({self.nome!r}, {self.colunas!r} -> {self.tabela_referenciada!r})"
+
+
+class Indice:
+    __slots__ = ("nome", "colunas", "unico")
+
+    def __init__(self, nome: str, colunas: list[str], unico: bool = False):
+        self.nome = nome
+        self.colunas = colunas
+        self.unico = unico
+
+    def __repr__(self):
+        return f"Indice({self.nome!r}, {self.colunas!r})"
+
+
+class Tabela:
+    __slots__ = ("nome", "colunas", "chaves_estrangeiras", "indices", "_colunas_por_nome", "_texto")
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.colunas = []
+        self.chaves_estrangeiras = []
+        self.indices = []
+        self._colunas_por_nome = {}
+        self._texto = None
+
+    def __repr__(self):
+        return f"Tabela({self.nome!r}, {len(self.colunas)} colunas)"
+
+    def adicionar_coluna(self, coluna: Coluna):
+        self.colunas.append(coluna)
+        self._colunas_por_nome[_normalizar(coluna.nome)] = coluna
+        self._texto = None
+
+    def adicionar_chave_estrangeira(self, fk: ChaveEstrangeira):
+        self.chaves_estrangeiras.append(fk)
+        self._texto = None
+
+    def adicionar_indice(self, indice: Indice):
+        self.indices.append(indice)
+        self._texto = None
+
+    def coluna(self, nome: str) -> Coluna | None:
+        """Busca uma coluna pelo nome (sem diferenciar maiúsculas/minúsculas)."""
+        return self._colunas_por_nome.get(_normalizar(nome))
+
+    @property
+    def chave_primaria(self) -> list[str]:
+        return [c.nome for c in self.colunas if c.chave_primaria]
+
+    def renderizar(self) -> str:
+        """
+        Retorna o bloco de texto da tabela usado no prompt do LLM.
+        O texto é gerado apenas na primeira chamada e reaproveitado depois.
+        """
+        if self._texto is None:
+            linhas = [f"Tabela: {self.nome}"]
+            for c in self.colunas:
+                marcadores = []
+                if c.chave_primaria:
+                    marcadores.append("PK")
+                if not c.anulavel:
+                    marcadores.append("NOT NULL")
+                sufixo = f" [{', '.join(marcadores)}]" if marcadores else ""
+                linhas.append(f"  - {c.nome} ({c.tipo}){sufixo}")
+            for fk in self.chaves_estrangeiras:
+                linhas.append(f"  FK: ({', '.join(fk.colunas)}) -> {fk.tabela_referenciada}({', '.join(fk.colunas_referenciadas)})")
+            for idx in self.indices:
+                tipo = "UNIQUE " if idx.unico else ""
+                linhas.append(f"  {tipo}INDEX {idx.nome} ({', '.join(idx.colunas)})")
+            self._texto = "\n".join(linhas)
+        return self._texto
+
+
+class EsquemaBanco:
+    """
+    Modelo em memória do esquema do banco de dados, indexado por nome e sinônimos.
+    """
+    __slots__ = ("tabelas", "_por_nome", "_por_sinonimo")
+
+    def __init__(self):
+        self.tabelas = []
+        self._por_nome = {}
+        self._por_sinonimo = {}
+
+    def __len__(self):
+        return len(self.tabelas)
+
+    def __iter__(self):
+        return iter(self.tabelas)
+
+    def adicionar_tabela(self, tabela: Tabela) -> Tabela:
+        self.tabelas.append(tabela)
+        self._por_nome[_normalizar(tabela.nome)] = tabela
+        for sinonimo in gerar_sinonimos(tabela.nome):
+            self._por_sinonimo.setdefault(sinonimo, tabela)
+        return tabela
+
+    def obter_ou_criar(self, nome: str) -> Tabela:
+        tabela = self._por_nome.get(_normalizar(nome))
+        if tabela is None:
+            tabela = self.adicionar_tabela(Tabela(nome))
+        return tabela
+
+    def tabela(self, nome: str) -> Tabela | None:
+        """Busca uma tabela pelo nome exato ou por um de seus sinônimos."""
+        chave = _normalizar(nome)
+        tabela = self._por_nome.get(chave)
+        if tabela is None:
+            tabela = self._por_sinonimo.get(chave) or self._por_sinonimo.get(_singular(chave))
+        return tabela
+
+    def encontrar_tabelas(self, texto: str) -> list[Tabela]:
+        """
+        Retorna as tabelas citadas em um texto livre (ex: o prompt do usuário), na ordem em que aparecem.
+        """
+        encontradas = []
+        for palavra in _PALAVRA_RE.findall(texto.lower()):
+            tabela = self.tabela(palavra)
+            if tabela is not None and tabela not in encontradas:
+                encontradas.append(tabela)
+        return encontradas
+
+    def _selecionar(self, tabelas) -> list[Tabela]:
+        if tabelas is None:
+            return self.tabelas
+        selecionadas = []
+        for t in tabelas:
+            tabela = t if isinstance(t, Tabela) else self.tabela(t)
+            if tabela is not None:
+                selecionadas.append(tabela)
+        return selecionadas
+
+    def renderizar_prompt(self, tabelas=None) -> str:
+        """
+        Gera o texto do esquema para o prompt do LLM.
+
+        Args:
+            tabelas (Iterable[str | Tabela] | None): Subconjunto de tabelas a renderizar; todas se None.
+
+        Returns:
+            str: Texto no formato "Tabela: ...\\n  - coluna (tipo)" separado por linhas em branco.
+        """
+        return "\n\n".join(t.renderizar() for t in self._selecionar(tabelas))
@@ -0,0 +1,381 @@
+import threading
+import time
+from collections import deque
+
+from config import DB_NAME, DB_TYPE
+from utils import log_event
+
+# Intervalo entre as verificações de alteração no catálogo (segundos)
+STATS_REFRESH_INTERVAL_S = 300
+# Quantidade de amostras mantidas por tabela para calcular a tendência de crescimento
+STATS_HISTORY_SIZE = 48
+# Horizonte usado para projetar o tamanho das tabelas nos guardas de tabela grande (segundos)
+STATS_GROWTH_HORIZON_S = 24 * 3600
+
+# Quantidade máxima de tabelas relidas por consulta (o SQL Server aceita até 2100 parâmetros)
+STATS_BATCH_SIZE = 500
+
+# Consultas leves que retornam um "marcador" de alteração por tabela.
+# Apenas as tabelas cujo marcador mudou desde a última passada são relidas.
+_MARCADORES_SQL = {
+    'postgresql': """
+        SELECT relname,
+               n_tup_ins + n_tup_upd + n_tup_del AS modificacoes,
+               COALESCE(last_analyze, last_autoanalyze) AS ultima_analise
+        FROM pg_stat_user_tables
+        WHERE schemaname = 'public';
+    """,
+    # sys.tables.modify_date só muda com DDL; as contagens de linhas e páginas mudam com os dados
+    'sqlserver': """
+        SELECT t.name, SUM(CASE WHEN p.index_id IN (0, 1) THEN p.row_count ELSE 0 END), SUM(p.reserved_page_count)
+        FROM sys.tables t
+        INNER JOIN sys.dm_db_partition_stats p ON p.object_id = t.object_id
+        GROUP BY t.name;
+    """,
+    'mysql': """
+        SELECT table_name, COALESCE(update_time, create_time)
+        FROM information_schema.tables
+        WHERE table_schema = %s AND table_type = 'BASE TABLE';
+    """,
+}
+
+# Consultas de estatísticas: (tabela, bytes, linhas, ...). `{filtro}` restringe às tabelas informadas
+# (ver `montar_consulta_estatisticas`); vazio, a consulta traz todas. Para o PostgreSQL também são
+# trazidos os dados necessários para estimar as linhas de tabelas nunca analisadas (reltuples = -1).
+_ESTATISTICAS_SQL = {
+    'postgresql': """
+        SELECT
+            c.relname,
+            pg_total_relation_size(c.oid) AS total_size_bytes,
+            c.reltuples AS row_count,
+            c.relpages,
+            pg_relation_size(c.oid) / current_setting('block_size')::int AS paginas_atuais,
+            current_setting('block_size')::int AS block_size,
+            COALESCE(s.n_live_tup, 0) AS n_live_tup,
+            (SELECT COALESCE(SUM(CASE WHEN a.attlen > 0 THEN a.attlen ELSE 32 END), 0)
+             FROM pg_attribute a
+             WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped) AS largura_tupla
+        FROM pg_class c
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.relkind = 'r'
+          AND c.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
+          {filtro}
+        ORDER BY c.relname;
+    """,
+    # sys.dm_db_partition_stats evita o join com sys.allocation_units
+    'sqlserver': """
+        SELECT
+            t.name,
+            SUM(p.reserved_page_count) * 8 * 1024 AS total_size_bytes,
+            SUM(CASE WHEN p.index_id IN (0, 1) THEN p.row_count ELSE 0 END) AS row_count
+        FROM sys.tables t
+        INNER JOIN sys.dm_db_partition_stats p ON p.object_id = t.object_id
+        {filtro}
+        GROUP BY t.name
+        ORDER BY t.name;
+    """,
+    'mysql': """
+        SELECT table_name, data_length + index_length AS total_size_bytes, table_rows AS row_count
+        FROM information_schema.tables
+        WHERE table_schema = %s AND table_type = 'BASE TABLE' {filtro}
+        ORDER BY table_name;
+    """,
+    # Requer a tabela virtual dbstat (SQLITE_ENABLE_DBSTAT_VTAB); não há estimativa de linhas
+    'sqlite': """
+        SELECT name, SUM(pgsize) AS total_size_bytes, NULL AS row_count
+        FROM dbstat
+        WHERE name IN (SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' {filtro})
+        GROUP BY name
+        ORDER BY name;
+    """,
+}
+
+# Alternativa do SQL Server sem sys.dm_db_partition_stats, que exige a permissão VIEW DATABASE STATE.
+# Usada como consulta de estatísticas e, sem filtro, como marcador de alteração.
+_SQLSERVER_CATALOGO_SQL = """
+    SELECT
+        t.name,
+        SUM(a.total_pages) * 8 * 1024 AS total_size_bytes,
+        SUM(CASE WHEN a.type = 1 AND p.index_id IN (0, 1) THEN p.rows ELSE 0 END) AS row_count
+    FROM sys.tables t
+    INNER JOIN sys.partitions p ON p.object_id = t.object_id
+    INNER JOIN sys.allocation_units a ON a.container_id = p.partition_id
+    {filtro}
+    GROUP BY t.name
+    ORDER BY t.name;
+"""
+# Passa a True no primeiro erro de permissão em sys.dm_db_partition_stats (ver `usar_catalogo_sem_dmv`)
+_sqlserver_sem_dmv = False
+
+# Filtro por lista de tabelas de cada dialeto; `{marcadores}` recebe um marcador de parâmetro por tabela
+_FILTRO_TABELAS_SQL = {
+    'postgresql': "AND c.relname = ANY(%s)",
+    'sqlserver': "WHERE t.name IN ({marcadores})",
+    'mysql': "AND table_name IN ({marcadores})",
+    'sqlite': "AND name IN ({marcadores})",
+}
+
+# Sobrecarga aproximada por tupla e por página no PostgreSQL (cabeçalhos + ponteiros)
+_PG_OVERHEAD_TUPLA = 28
+_PG_OVERHEAD_PAGINA = 24
+
+
+def _estimar_linhas_postgresql(row_count, relpages, paginas_atuais, block_size, n_live_tup, largura_tupla) -> int:
+    """
+    Estima a contagem de linhas de uma tabela PostgreSQL.
+
+    Usa `reltuples` escalado pelo número atual de páginas quando a tabela já foi analisada com
+    dados (relpages > 0). Caso contrário (nunca analisada, com reltuples = -1 ou, antes do
+    PostgreSQL 14, reltuples = 0; ou analisada ainda vazia) recorre ao `n_live_tup` do coletor
+    de estatísticas e, na falta dele, à densidade estimada de tuplas por bloco.
+    """
+    paginas_atuais = paginas_atuais or 0
+    if row_count is not None and row_count >= 0 and relpages and relpages > 0:
+        # Mesma extrapolação feita pelo planejador: densidade * páginas atuais
+        return int(round(row_count / relpages * paginas_atuais))
+    if n_live_tup:
+        return int(n_live_tup)
+    if paginas_atuais and block_size:
+        tuplas_por_pagina = max(1, (block_size - _PG_OVERHEAD_PAGINA) // ((largura_tupla or 32) + _PG_OVERHEAD_TUPLA))
+        return int(paginas_atuais * tuplas_por_pagina)
+    return 0
+
+
+def suporta_estatisticas(db_type: str = DB_TYPE) -> bool:
+    """Indica se há consulta de tamanho/contagem de linhas para o tipo de banco informado."""
+    return db_type in _ESTATISTICAS_SQL
+
+
+def usar_catalogo_sem_dmv(erro: Exception) -> bool:
+    """
+    Se o erro for a falta da permissão VIEW DATABASE STATE no SQL Server, passa a usar
+    `sys.partitions`/`sys.allocation_units` nas consultas de estatísticas.
+
+    Returns:
+        bool: True se a alternativa acabou de ser ativada e a consulta deve ser repetida.
+    """
+    global _sqlserver_sem_dmv
+    if DB_TYPE != 'sqlserver' or _sqlserver_sem_dmv or 'VIEW DATABASE STATE' not in str(erro).upper():
+        return False
+    _sqlserver_sem_dmv = True
+    log_event("Sem permissão VIEW DATABASE STATE; estatísticas do SQL Server lidas de sys.partitions/sys.allocation_units.")
+    return True
+
+
+def _sql_estatisticas() -> str:
+    if DB_TYPE == 'sqlserver' and _sqlserver_sem_dmv:
+        return _SQLSERVER_CATALOGO_SQL
+    return _ESTATISTICAS_SQL[DB_TYPE]
+
+
+def _sql_marcadores() -> str:
+    if DB_TYPE == 'sqlserver' and _sqlserver_sem_dmv:
+        return _SQLSERVER_CATALOGO_SQL.format(filtro="")
+    return _MARCADORES_SQL[DB_TYPE]
+
+
+def montar_consulta_estatisticas(tabelas: list[str] | None = None) -> tuple[str, tuple]:
+    """
+    Monta a consulta de tamanho e contagem de linhas do dialeto configurado.
+
+    Args:
+        tabelas (list[str] | None): Restringe a consulta a estas tabelas; todas se None.
+
+    Returns:
+        tuple[str, tuple]: O SQL e seus parâmetros (marcadores do DB-API do dialeto).
+    """
+    params = (DB_NAME,) if DB_TYPE == 'mysql' else ()
+    sql = _sql_estatisticas()
+    if tabelas is None:
+        return sql.format(filtro=""), params
+    if DB_TYPE == 'postgresql':
+        return sql.format(filtro=_FILTRO_TABELAS_SQL[DB_TYPE]), (list(tabelas),)
+    marcador = "%s" if DB_TYPE == 'mysql' else "?"
+    filtro = _FILTRO_TABELAS_SQL[DB_TYPE].format(marcadores=", ".join([marcador] * len(tabelas)))
+    return sql.format(filtro=filtro), params + tuple(tabelas)
+
+
+def montar_estatisticas(rows) -> dict:
+    """
+    Converte as linhas de `montar_consulta_estatisticas` no dicionário retornado por
+    `db.get_table_size_and_row_count`: nome da tabela -> {'size_bytes', 'row_count'}.
+    No PostgreSQL a contagem de linhas é estimada com `_estimar_linhas_postgresql`.
+    """
+    table_stats = {}
+    for row in rows:
+        size_bytes = row[1] if row[1] is not None else 0
+        if DB_TYPE == 'postgresql':
+            row_count = _estimar_linhas_postgresql(*row[2:])
+        else:
+            row_count = row[2] if row[2] is not None else 0
+        table_stats[row[0]] = {'size_bytes': int(size_bytes), 'row_count': int(row_count)}
+    return table_stats
+
+
+class ColetorEstatisticas:
+    """
+    Coleta em segundo plano o tamanho e a contagem de linhas das tabelas.
+
+    A cada passada consulta apenas os marcadores de alteração do catálogo
+    (`pg_stat_user_tables`, `sys.dm_db_partition_stats`, `information_schema.tables.update_time`)
+    e relê, em lote, somente as tabelas que mudaram. Mantém um histórico por tabela para que
+    a tendência de crescimento alimente os guardas de tabela grande.
+    """
+
+    def __init__(self, conectar, intervalo_s: float = STATS_REFRESH_INTERVAL_S,
+                 tamanho_historico: int = STATS_HISTORY_SIZE):
+        """
+        Args:
+            conectar (callable): Função sem argumentos que retorna uma nova conexão (ex: `db.conectar_banco`).
+            intervalo_s (float): Intervalo entre as passadas em segundo plano.
+            tamanho_historico (int): Número de amostras mantidas por tabela.
+        """
+        self._conectar = conectar
+        self._intervalo_s = intervalo_s
+        self._tamanho_historico = tamanho_historico
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._primeira_coleta = threading.Event()
+        self._thread = None
+        self._marcadores = {}
+        self._estatisticas = {}
+        self._historico = {}
+
+    def iniciar(self):
+        """Inicia a thread de coleta, se ainda não estiver em execução."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="coletor-estatisticas", daemon=True)
+        self._thread.start()
+        log_event("Coletor de estatísticas das tabelas iniciado.")
+
+    def parar(self):
+        """Sinaliza a thread de coleta para encerrar."""
+        self._parar.set()
+
+    def aguardar_primeira_coleta(self, timeout: float | None = None) -> bool:
+        """Bloqueia até a primeira passada terminar ou o timeout expirar."""
+        return self._primeira_coleta.wait(timeout)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            conn = self._conectar()
+            if conn:
+                try:
+                    self.atualizar(conn)
+                finally:
+                    conn.close()
+            self._primeira_coleta.set()
+            self._parar.wait(self._intervalo_s)
+
+    def atualizar(self, conn) -> int:
+        """
+        Executa uma passada de coleta usando a conexão informada.
+
+        Args:
+            conn: Objeto de conexão com o banco de dados.
+
+        Returns:
+            int: Quantidade de tabelas relidas nesta passada.
+        """
+        if DB_TYPE not in _MARCADORES_SQL:
+            log_event(f"Tipo de banco de dados {DB_TYPE} não suportado pelo coletor de estatísticas.")
+            return 0
+        try:
+            cursor = conn.cursor()
+            if DB_TYPE == 'mysql':
+                cursor.execute(_sql_marcadores(), (DB_NAME,))
+            else:
+                cursor.execute(_sql_marcadores())
+            marcadores = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+            with self._lock:
+                alteradas = [t for t, m in marcadores.items() if self._marcadores.get(t) != m]
+                removidas = [t for t in self._estatisticas if t not in marcadores]
+
+            agora = time.time()
+            novas = {}
+            for i in range(0, len(alteradas), STATS_BATCH_SIZE):
+                novas.update(self._ler_tabelas(cursor, alteradas[i:i + STATS_BATCH_SIZE]))
+            cursor.close()
+
+            with self._lock:
+                for tabela in removidas:
+                    self._estatisticas.pop(tabela, None)
+                    self._historico.pop(tabela, None)
+                    self._marcadores.pop(tabela, None)
+                for tabela, stats in novas.items():
+                    self._estatisticas[tabela] = stats
+                    self._marcadores[tabela] = marcadores[tabela]
+                # Toda passada gera uma amostra, inclusive das tabelas sem alteração (com os últimos
+                # valores), para que a tendência de uma tabela que parou de crescer caia a zero
+                for tabela, stats in self._estatisticas.items():
+                    historico = self._historico.setdefault(tabela, deque(maxlen=self._tamanho_historico))
+                    historico.append((agora, stats['size_bytes'], stats['row_count']))
+            log_event(f"Estatísticas atualizadas: {len(novas)} de {len(marcadores)} tabelas relidas.")
+            return len(novas)
+        except Exception as e:
+            if usar_catalogo_sem_dmv(e):
+                return self.atualizar(conn)
+            log_event(f"Erro ao atualizar estatísticas das tabelas: {e}")
+            return 0
+
+    def _ler_tabelas(self, cursor, tabelas: list[str]) -> dict:
+        """Lê o tamanho e a contagem de linhas das tabelas informadas em uma única consulta."""
+        if not tabelas:
+            return {}
+        cursor.execute(*montar_consulta_estatisticas(tabelas))
+        return montar_estatisticas(cursor.fetchall())
+
+    def obter_estatisticas(self) -> dict:
+        """
+        Retorna as estatísticas mais recentes no mesmo formato de `db.get_table_size_and_row_count`,
+        acrescidas de 'growth_bytes_per_s' e 'projected_size_bytes'.
+        """
+        with self._lock:
+            resultado = {}
+            for tabela, stats in self._estatisticas.items():
+                crescimento = self._crescimento(tabela)
+                resultado[tabela] = {
+                    **stats,
+                    'growth_bytes_per_s': crescimento,
+                    'projected_size_bytes': max(stats['size_bytes'],
+                                                int(stats['size_bytes'] + crescimento * STATS_GROWTH_HORIZON_S)),
+                }
+            return resultado
+
+    def historico(self, tabela: str) -> list[tuple[float, int, int]]:
+        """Retorna as amostras (timestamp, size_bytes, row_count) coletadas para a tabela."""
+        with self._lock:
+            return list(self._historico.get(tabela, ()))
+
+    def _crescimento(self, tabela: str) -> float:
+        # Inclinação entre a amostra mais antiga e a mais recente da janela (bytes por segundo);
+        # como cada passada gera uma amostra, o crescimento antigo sai da janela com o tempo
+        amostras = self._historico.get(tabela)
+        if not amostras or len(amostras) < 2:
+            return 0.0
+        (t0, s0, _), (t1, s1, _) = amostras[0], amostras[-1]
+        if t1 <= t0:
+            return 0.0
+        return (s1 - s0) / (t1 - t0)
+
+
+_coletor = None
+_coletor_lock = threading.Lock()
+
+
+def obter_coletor(conectar) -> ColetorEstatisticas:
+    """
+    Retorna o coletor de estatísticas compartilhado pelo processo, iniciando-o na primeira chamada.
+
+    Args:
+        conectar (callable): Função sem argumentos que retorna uma nova conexão.
+    """
+    global _coletor
+    with _coletor_lock:
+        if _coletor is None:
+            _coletor = ColetorEstatisticas(conectar)
+            _coletor.iniciar()
+        return _coletor